@@ -6,20 +6,30 @@ sys.path.append('/Users/sanikeit/Documents/trae_projects/aries/services/api')
 
 from app.main import app
 
-print("=== REGISTERED ROUTES ===")
+# Routes are immutable once the app is built; index them by path once
+routes_by_path = {}
 for route in app.routes:
-    try:
-        if hasattr(route, 'methods'):
-            print(f"Path: {route.path}, Methods: {route.methods}, Name: {route.name}")
+    if hasattr(route, 'path'):
+        routes_by_path.setdefault(route.path, []).append(route)
+
+print("=== REGISTERED ROUTES ===")
+for path, routes in routes_by_path.items():
+    for route in routes:
+        methods = getattr(route, 'methods', None)
+        if methods:
+            print(f"Path: {path}, Methods: {methods}, Name: {route.name}")
         else:
-            print(f"Path: {route.path}, Type: {type(route).__name__}, Name: {route.name}")
-    except Exception as e:
-        print(f"Error with route: {e}")
-    
+            print(f"Path: {path}, Type: {type(route).__name__}, Name: {route.name}")
+
 print("\n=== LOOKING FOR CAMERA ROUTES ===")
-camera_routes = [r for r in app.routes if hasattr(r, 'path') and ('camera' in r.path or 'start_stream' in r.path)]
-for route in camera_routes:
-    if hasattr(route, 'methods'):
-        print(f"Path: {route.path}, Methods: {route.methods}")
-    else:
-        print(f"Path: {route.path}, Type: {type(route).__name__}")
\ No newline at end of file
+camera_routes = {
+    path: routes for path, routes in routes_by_path.items()
+    if 'camera' in path or 'start_stream' in path
+}
+for path, routes in camera_routes.items():
+    for route in routes:
+        methods = getattr(route, 'methods', None)
+        if methods:
+            print(f"Path: {path}, Methods: {methods}")
+        else:
+            print(f"Path: {path}, Type: {type(route).__name__}")
@@ -3,6 +3,7 @@
 import asyncio
 import sys
 import os
+from pathlib import Path
 sys.path.insert(0, '/Users/sanikeit/Documents/trae_projects/aries/services/api')
 
 from app.services.mock_stream_processor import mock_stream_processor
@@ -30,9 +31,6 @@ async def test_stream_processor():
             await asyncio.sleep(5)
             
             # Check if files were created
-            import os
-            from pathlib import Path
-            
             stream_dir = Path("./hls_streams") / camera_id
             if stream_dir.exists():
                 files = list(stream_dir.glob("*"))
@@ -1,6 +1,12 @@
 # Aries-Edge Schemas
 
 from .schemas import (
+    # Constrained string types
+    UuidStr,
+    EmailAddress,
+    UrlStr,
+    QualityStr,
+    
     # Enums
     UserRole,
     UserStatus,
@@ -9,12 +15,15 @@ from .schemas import (
     StreamStatus,
     StreamType,
     DetectionClass,
+    DETECTION_CLASSES,
+    DetectionClassName,
     TokenType,
     EventType,
     WsMessageType,
     
     # Base models
     TimestampMixin,
+    EventTimeMixin,
     
     # User models
     UserBase,
@@ -74,6 +83,12 @@ from .schemas import (
 
 __version__ = "1.0.0"
 __all__ = [
+    # Constrained string types
+    "UuidStr",
+    "EmailAddress",
+    "UrlStr",
+    "QualityStr",
+    
     # Enums
     "UserRole",
     "UserStatus", 
@@ -82,12 +97,15 @@ __all__ = [
     "StreamStatus",
     "StreamType",
     "DetectionClass",
+    "DETECTION_CLASSES",
+    "DetectionClassName",
     "TokenType",
     "EventType",
     "WsMessageType",
     
     # Base models
     "TimestampMixin",
+    "EventTimeMixin",
     
     # User models
     "UserBase",
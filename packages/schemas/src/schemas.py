@@ -3,11 +3,23 @@ Shared schemas for Aries-Edge Platform
 Compatible with SQLModel and Pydantic
 """
 
-from typing import Optional, List, Dict, Any
-from datetime import datetime
+import time
+from typing import Optional, List, Dict, Any, Generic, TypeVar
+from typing_extensions import Annotated
+from datetime import datetime, timezone
 from enum import Enum
-from pydantic import BaseModel, Field, validator
-from sqlmodel import SQLModel
+from pydantic import AfterValidator, BaseModel, ConfigDict, Field, TypeAdapter, computed_field, model_validator, validator
+
+# Patterns, written once and shared by every field that uses them
+_UUID_PATTERN = r'^[0-9a-f]{8}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{12}$'
+_EMAIL_PATTERN = r'^[^@]+@[^@]+\.[^@]+$'
+_URL_PATTERN = r'^[a-zA-Z][a-zA-Z0-9+.-]*://.*'
+_QUALITY_PATTERN = r'^(low|medium|high|ultra)$'
+
+UuidStr = Annotated[str, Field(pattern=_UUID_PATTERN)]
+EmailAddress = Annotated[str, Field(pattern=_EMAIL_PATTERN)]
+UrlStr = Annotated[str, Field(pattern=_URL_PATTERN)]
+QualityStr = Annotated[str, Field(pattern=_QUALITY_PATTERN)]
 
 # Enums
 class UserRole(str, Enum):
@@ -125,6 +137,16 @@ class DetectionClass(str, Enum):
     HAIR_DRIER = "hair drier"
     TOOTHBRUSH = "toothbrush"
 
+DETECTION_CLASSES = frozenset(c.value for c in DetectionClass)
+
+def _check_detection_class(value: str) -> str:
+    if value not in DETECTION_CLASSES:
+        raise ValueError(f"Unknown detection class: {value}")
+    return value
+
+# Plain str checked against a frozenset instead of an 80-member enum lookup
+DetectionClassName = Annotated[str, AfterValidator(_check_detection_class)]
+
 class TokenType(str, Enum):
     ACCESS = "access"
     REFRESH = "refresh"
@@ -148,23 +170,54 @@ class TimestampMixin(BaseModel):
     created_at: datetime = Field(default_factory=datetime.utcnow)
     updated_at: datetime = Field(default_factory=datetime.utcnow)
 
+_DATETIME = TypeAdapter(datetime)
+
+def _now_ms() -> int:
+    return time.time_ns() // 1_000_000
+
+def _epoch_ms(ts: datetime) -> int:
+    """Epoch milliseconds for a datetime; naive values are UTC, as everywhere in this package"""
+    if ts.tzinfo is None:
+        ts = ts.replace(tzinfo=timezone.utc)
+    return int(ts.timestamp() * 1000)
+
+class EventTimeMixin(BaseModel):
+    """Event time stored as integer epoch milliseconds; `timestamp` is derived"""
+    timestamp_ms: int = Field(default_factory=_now_ms)
+
+    @computed_field
+    @property
+    def timestamp(self) -> datetime:
+        return datetime.utcfromtimestamp(self.timestamp_ms / 1000)
+
+    @model_validator(mode="before")
+    @classmethod
+    def _timestamp_to_ms(cls, data: Any) -> Any:
+        """Accept a `timestamp` (datetime or anything Pydantic parses as one) in place of `timestamp_ms`"""
+        if isinstance(data, dict) and "timestamp" in data:
+            data = dict(data)
+            ts = data.pop("timestamp")
+            if data.get("timestamp_ms") is None and ts is not None:
+                data["timestamp_ms"] = _epoch_ms(_DATETIME.validate_python(ts))
+        return data
+
 # User models
 class UserBase(BaseModel):
     username: str = Field(min_length=3, max_length=50)
-    email: str = Field(pattern=r'^[^@]+@[^@]+\.[^@]+$')
+    email: EmailAddress
     full_name: str = Field(min_length=1, max_length=100)
     role: UserRole
     status: UserStatus = UserStatus.ACTIVE
 
 class User(UserBase, TimestampMixin):
-    id: str = Field(pattern=r'^[0-9a-f]{8}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{12}$')
+    id: UuidStr
 
 class CreateUser(UserBase):
     password: str = Field(min_length=8)
 
 class UpdateUser(BaseModel):
     username: Optional[str] = Field(None, min_length=3, max_length=50)
-    email: Optional[str] = Field(None, pattern=r'^[^@]+@[^@]+\.[^@]+$')
+    email: Optional[EmailAddress] = None
     full_name: Optional[str] = Field(None, min_length=1, max_length=100)
     role: Optional[UserRole] = None
     status: Optional[UserStatus] = None
@@ -172,6 +225,8 @@ class UpdateUser(BaseModel):
 
 # Camera models
 class BoundingBox(BaseModel):
+    model_config = ConfigDict(frozen=True)
+
     x: float = Field(ge=0, le=1)
     y: float = Field(ge=0, le=1)
     width: float = Field(gt=0, le=1)
@@ -187,13 +242,13 @@ class CameraBase(BaseModel):
     name: str = Field(min_length=1, max_length=100)
     description: Optional[str] = Field(None, max_length=500)
     type: CameraType
-    url: str = Field(pattern=r'^[a-zA-Z][a-zA-Z0-9+.-]*://.*')
+    url: UrlStr
     is_active: bool = True
     roi: Optional[List[BoundingBox]] = None
     analytics_config: Optional[AnalyticsConfig] = None
 
 class Camera(CameraBase, TimestampMixin):
-    id: str = Field(pattern=r'^[0-9a-f]{8}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{12}$')
+    id: UuidStr
     status: CameraStatus = CameraStatus.OFFLINE
 
 class CreateCamera(CameraBase):
@@ -203,21 +258,21 @@ class UpdateCamera(BaseModel):
     name: Optional[str] = Field(None, min_length=1, max_length=100)
     description: Optional[str] = Field(None, max_length=500)
     type: Optional[CameraType] = None
-    url: Optional[str] = Field(None, pattern=r'^[a-zA-Z][a-zA-Z0-9+.-]*://.*')
+    url: Optional[UrlStr] = None
     is_active: Optional[bool] = None
     roi: Optional[List[BoundingBox]] = None
     analytics_config: Optional[AnalyticsConfig] = None
 
 # Stream models
 class StreamBase(BaseModel):
-    camera_id: str = Field(pattern=r'^[0-9a-f]{8}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{12}$')
+    camera_id: UuidStr
     type: StreamType
-    endpoint: str = Field(pattern=r'^[a-zA-Z][a-zA-Z0-9+.-]*://.*')
-    quality: str = Field(pattern=r'^(low|medium|high|ultra)$')
+    endpoint: UrlStr
+    quality: QualityStr
     metadata_enabled: bool = True
 
 class Stream(StreamBase, TimestampMixin):
-    id: str = Field(pattern=r'^[0-9a-f]{8}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{12}$')
+    id: UuidStr
     status: StreamStatus = StreamStatus.IDLE
 
 class CreateStream(StreamBase):
@@ -225,6 +280,8 @@ class CreateStream(StreamBase):
 
 # Detection models
 class BoundingBoxDetection(BaseModel):
+    model_config = ConfigDict(frozen=True)
+
     x: int = Field(ge=0)
     y: int = Field(ge=0)
     width: int = Field(gt=0)
@@ -232,42 +289,44 @@ class BoundingBoxDetection(BaseModel):
     confidence: float = Field(ge=0, le=1)
 
 class DetectionBase(BaseModel):
-    camera_id: str = Field(pattern=r'^[0-9a-f]{8}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{12}$')
-    class_name: DetectionClass
+    camera_id: UuidStr
+    class_name: DetectionClassName
     bbox: BoundingBoxDetection
     confidence: float = Field(ge=0, le=1)
     frame_number: int = Field(gt=0)
     metadata: Optional[Dict[str, Any]] = None
 
-class Detection(DetectionBase):
-    id: str = Field(pattern=r'^[0-9a-f]{8}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{12}$')
-    timestamp: datetime = Field(default_factory=datetime.utcnow)
+class Detection(DetectionBase, EventTimeMixin):
+    id: UuidStr
 
 class CreateDetection(DetectionBase):
     pass
 
 # Analytics event models
 class AnalyticsEventBase(BaseModel):
-    camera_id: str = Field(pattern=r'^[0-9a-f]{8}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{12}$')
+    camera_id: UuidStr
     event_type: EventType
     detections: List[Detection]
     metadata: Optional[Dict[str, Any]] = None
 
-class AnalyticsEvent(AnalyticsEventBase):
-    id: str = Field(pattern=r'^[0-9a-f]{8}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{12}$')
-    timestamp: datetime = Field(default_factory=datetime.utcnow)
+class AnalyticsEvent(AnalyticsEventBase, EventTimeMixin):
+    id: UuidStr
 
 class CreateAnalyticsEvent(AnalyticsEventBase):
     pass
 
 # Authentication models
 class Token(BaseModel):
+    model_config = ConfigDict(frozen=True)
+
     access_token: str
     token_type: str = "bearer"
     expires_in: int = Field(gt=0)
     refresh_token: Optional[str] = None
 
 class Login(BaseModel):
+    model_config = ConfigDict(frozen=True)
+
     username: str = Field(min_length=1)
     password: str = Field(min_length=1)
 
@@ -277,7 +336,7 @@ class ApiKeyBase(BaseModel):
     expires_at: Optional[datetime] = None
 
 class ApiKey(ApiKeyBase, TimestampMixin):
-    id: str = Field(pattern=r'^[0-9a-f]{8}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{12}$')
+    id: UuidStr
     key: str
     last_used: Optional[datetime] = None
 
@@ -285,21 +344,22 @@ class CreateApiKey(ApiKeyBase):
     pass
 
 # WebSocket message models
-class WsMessageBase(BaseModel):
-    payload: Dict[str, Any]
-    camera_id: Optional[str] = Field(None, pattern=r'^[0-9a-f]{8}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{12}$')
+PayloadT = TypeVar("PayloadT")
+
+class WsMessageBase(BaseModel, Generic[PayloadT]):
+    model_config = ConfigDict(frozen=True)
 
-class WsMessage(WsMessageBase):
+    payload: PayloadT
+    camera_id: Optional[UuidStr] = None
+
+class WsMessage(WsMessageBase[PayloadT], EventTimeMixin, Generic[PayloadT]):
     type: WsMessageType
-    timestamp: datetime = Field(default_factory=datetime.utcnow)
 
-class DetectionWsMessage(WsMessage):
+class DetectionWsMessage(WsMessage[Detection]):
     type: WsMessageType = WsMessageType.DETECTION
-    payload: Detection
 
-class AnalyticsWsMessage(WsMessage):
+class AnalyticsWsMessage(WsMessage[AnalyticsEvent]):
     type: WsMessageType = WsMessageType.ANALYTICS
-    payload: AnalyticsEvent
 
 # Configuration models
 class SystemConfig(BaseModel):
@@ -307,7 +367,7 @@ class SystemConfig(BaseModel):
     max_streams_per_camera: int = Field(gt=0)
     detection_threshold: float = Field(ge=0, le=1)
     nms_threshold: float = Field(ge=0, le=1)
-    stream_quality: str = Field(pattern=r'^(low|medium|high|ultra)$')
+    stream_quality: QualityStr
     analytics_enabled: bool
     retention_days: int = Field(gt=0)
 
@@ -316,25 +376,16 @@ class UpdateSystemConfig(BaseModel):
     max_streams_per_camera: Optional[int] = Field(None, gt=0)
     detection_threshold: Optional[float] = Field(None, ge=0, le=1)
     nms_threshold: Optional[float] = Field(None, ge=0, le=1)
-    stream_quality: Optional[str] = Field(None, pattern=r'^(low|medium|high|ultra)$')
+    stream_quality: Optional[QualityStr] = None
     analytics_enabled: Optional[bool] = None
     retention_days: Optional[int] = Field(None, gt=0)
 
 # SQLModel compatibility
-class UserModel(SQLModel, User):
-    pass
-
-class CameraModel(SQLModel, Camera):
-    pass
-
-class StreamModel(SQLModel, Stream):
-    pass
-
-class DetectionModel(SQLModel, Detection):
-    pass
-
-class AnalyticsEventModel(SQLModel, AnalyticsEvent):
-    pass
-
-class ApiKeyModel(SQLModel, ApiKey):
-    pass
\ No newline at end of file
+# Aliases rather than SQLModel subclasses: none of these map to a table, and a
+# subclass would cost a second core-schema build per type at import.
+UserModel = User
+CameraModel = Camera
+StreamModel = Stream
+DetectionModel = Detection
+AnalyticsEventModel = AnalyticsEvent
+ApiKeyModel = ApiKey
@@ -1,17 +1,32 @@
-from pydantic_settings import BaseSettings
+from pydantic_settings import BaseSettings, SettingsConfigDict
+from functools import lru_cache
 from typing import Optional
 import os
 
 class Settings(BaseSettings):
     """Application settings"""
     
+    model_config = SettingsConfigDict(
+        env_file=".env",
+        case_sensitive=True,
+        frozen=True,
+        extra="ignore"
+    )
+    
     # Database
     DATABASE_URL: str = "sqlite+aiosqlite:///./aries.db"
+    DB_ECHO: bool = False
+    DB_POOL_SIZE: int = 25
+    DB_MAX_OVERFLOW: int = 25
+    DB_POOL_TIMEOUT: int = 5
+    DB_POOL_RECYCLE: int = 1800
+    DB_RAISE_ON_LAZY_LOAD: bool = False
     
     # JWT Security
     JWT_SECRET_KEY: str = "your-secret-key-here-change-in-production"
     JWT_ALGORITHM: str = "HS256"
     ACCESS_TOKEN_EXPIRE_MINUTES: int = 30
+    BCRYPT_ROUNDS: int = 10
     
     # Pulsar/Kafka
     PULSAR_URL: str = "pulsar://localhost:6650"
@@ -19,6 +34,8 @@ class Settings(BaseSettings):
     
     # HLS Streams
     HLS_OUTPUT_DIR: str = "./hls_streams"
+    HLS_ACCEL_REDIRECT_PREFIX: Optional[str] = None
+    CAMERA_BUFFER_FRAMES: int = 8
     
     # Model Configuration
     MODEL_CONFIG_DIR: str = "./configs"
@@ -33,9 +50,15 @@ class Settings(BaseSettings):
     # Rate Limiting
     RATE_LIMIT_PER_MINUTE: int = 100
     
-    class Config:
-        env_file = ".env"
-        case_sensitive = True
+    # Logging
+    LOG_LEVEL: str = "INFO"
+    DEBUG: bool = False
+
+
+@lru_cache(maxsize=1)
+def get_settings() -> Settings:
+    """Return the process-wide settings, parsing env/.env only once"""
+    return Settings()
 
-# Create settings instance
-settings = Settings()
\ No newline at end of file
+# Module-level handle for existing `from app.core.config import settings` imports
+settings = get_settings()
\ No newline at end of file
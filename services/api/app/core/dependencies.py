@@ -1,8 +1,16 @@
-from fastapi import Depends, HTTPException, status
+from fastapi import Depends, HTTPException, Request, status
 from fastapi.security import OAuth2PasswordBearer, HTTPBearer, HTTPAuthorizationCredentials
+from sqlalchemy.ext.asyncio import AsyncSession
 from typing import Optional, Union
+from uuid import UUID
+import logging
 from app.core.security import verify_token
 from app.core.config import settings
+from app.db.session import get_db
+from app.db.lookups import USER_BY_USERNAME
+from app.models.models import User
+
+logger = logging.getLogger(__name__)
 
 # OAuth2 scheme for JWT tokens
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/auth/token")
@@ -10,42 +18,55 @@ oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/auth/token")
 # API Key header scheme
 api_key_header = HTTPBearer(auto_error=False, scheme_name="API Key")
 
+def _user_id_claim(payload: dict) -> Optional[UUID]:
+    """User id carried in the token's `uid` claim (absent on tokens issued before it existed)"""
+    try:
+        return UUID(payload["uid"])
+    except (KeyError, TypeError, ValueError):
+        return None
+
 async def get_current_user_or_machine(
+    request: Request,
     token: Optional[str] = Depends(oauth2_scheme),
     api_key: Optional[HTTPAuthorizationCredentials] = Depends(api_key_header)
 ) -> dict:
     """
     Combined authentication dependency that tries JWT token first, then API key.
     This supports both user authentication and machine-to-machine authentication.
+    The resolved principal is cached on request.state.auth_principal.
     """
-    import logging
-    logger = logging.getLogger(__name__)
-    
-    logger.info(f"get_current_user_or_machine called with token: {token[:20] if token else None}, api_key: {api_key.credentials[:20] if api_key else None}")
+    principal = getattr(request.state, "auth_principal", None)
+    if principal is not None:
+        return principal
     
     # Try JWT token authentication first
     if token:
-        logger.info("Attempting JWT token authentication")
         payload = verify_token(token)
         if payload:
-            logger.info(f"JWT authentication successful for user: {payload.get('sub')}")
-            return {"type": "user", "username": payload.get("sub"), "payload": payload}
+            principal = {
+                "type": "user",
+                "username": payload.get("sub"),
+                "id": _user_id_claim(payload),
+                "payload": payload
+            }
+            request.state.auth_principal = principal
+            return principal
         else:
-            logger.error("JWT token verification failed")
+            logger.debug("JWT token verification failed")
     
     # Try API key authentication
     if api_key:
-        logger.info("Attempting API key authentication")
         # In a real implementation, you would validate the API key against a database
         # For now, we'll use a simple validation
         if api_key.credentials and len(api_key.credentials) > 20:
-            logger.info("API key authentication successful")
-            return {"type": "machine", "api_key": api_key.credentials}
+            principal = {"type": "machine", "api_key": api_key.credentials}
+            request.state.auth_principal = principal
+            return principal
         else:
-            logger.error("API key validation failed")
+            logger.debug("API key validation failed")
     
     # Both authentication methods failed
-    logger.error("Both JWT and API key authentication failed")
+    logger.debug("Both JWT and API key authentication failed")
     raise HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
         detail="Could not validate credentials",
@@ -56,20 +77,43 @@ async def get_current_active_user(
     current_user: dict = Depends(get_current_user_or_machine)
 ) -> dict:
     """Get current active user (JWT authenticated)"""
-    import logging
-    logger = logging.getLogger(__name__)
-    
-    logger.info(f"get_current_active_user called with: {current_user}")
-    
     if current_user["type"] != "user":
-        logger.error(f"Authentication failed - user type is {current_user['type']}, expected 'user'")
+        logger.debug("Authentication failed - user type is %s, expected 'user'", current_user["type"])
         raise HTTPException(
             status_code=status.HTTP_403_FORBIDDEN,
             detail="User authentication required"
         )
-    logger.info(f"Authentication successful for user: {current_user.get('username')}")
     return current_user
 
+async def get_current_db_user(
+    request: Request,
+    current_user: dict = Depends(get_current_active_user),
+    db: AsyncSession = Depends(get_db)
+) -> User:
+    """Resolve the authenticated user's row once per request (cached on request.state.auth_user)"""
+    user = getattr(request.state, "auth_user", None)
+    if user is None:
+        result = await db.execute(USER_BY_USERNAME, {"username": current_user["username"]})
+        user = result.scalar_one_or_none()
+        if not user:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail="User not found"
+            )
+        request.state.auth_user = user
+    return user
+
+async def get_current_user_id(
+    request: Request,
+    current_user: dict = Depends(get_current_active_user),
+    db: AsyncSession = Depends(get_db)
+) -> UUID:
+    """Authenticated user's id, straight from the token; older tokens fall back to one lookup"""
+    if current_user["id"] is not None:
+        return current_user["id"]
+    user = await get_current_db_user(request, current_user, db)
+    return user.id
+
 async def get_current_machine(
     current_machine: dict = Depends(get_current_user_or_machine)
 ) -> dict:
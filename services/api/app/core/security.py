@@ -1,19 +1,32 @@
-from passlib.context import CryptContext
+import bcrypt
 from datetime import datetime, timedelta
 from typing import Optional
-from jose import JWTError, jwt
+import jwt
+from cachetools import TTLCache
+import time
+import logging
 from app.core.config import settings
 
-# Password hashing context
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+logger = logging.getLogger(__name__)
+
+# Decoded JWT payloads keyed by raw token, stored with their expiry
+_jwt_cache: TTLCache = TTLCache(maxsize=4096, ttl=60)
 
 def verify_password(plain_password: str, hashed_password: str) -> bool:
     """Verify a password against its hash"""
-    return pwd_context.verify(plain_password, hashed_password)
+    try:
+        return bcrypt.checkpw(plain_password.encode("utf-8"), hashed_password.encode("utf-8"))
+    except ValueError:
+        # Not a bcrypt hash
+        return False
 
 def get_password_hash(password: str) -> str:
     """Generate password hash"""
-    return pwd_context.hash(password)
+    return bcrypt.hashpw(password.encode("utf-8"), bcrypt.gensalt(rounds=settings.BCRYPT_ROUNDS)).decode("utf-8")
+
+def warm_up_password_hashing() -> None:
+    """Run one hash/verify so the first login doesn't pay one-off setup costs"""
+    verify_password("warmup", get_password_hash("warmup"))
 
 def create_access_token(data: dict, expires_delta: Optional[timedelta] = None) -> str:
     """Create JWT access token"""
@@ -29,19 +42,22 @@ def create_access_token(data: dict, expires_delta: Optional[timedelta] = None) -
 
 def verify_token(token: str) -> Optional[dict]:
     """Verify JWT token and return payload"""
-    import logging
-    logger = logging.getLogger(__name__)
-    
-    logger.info(f"verify_token called with token: {token[:20]}...")
+    cached = _jwt_cache.get(token)
+    if cached is not None:
+        payload, exp = cached
+        if exp is None or exp > time.time():
+            return payload
+        _jwt_cache.pop(token, None)
+        return None
     
     try:
         payload = jwt.decode(token, settings.JWT_SECRET_KEY, algorithms=[settings.JWT_ALGORITHM])
         username: str = payload.get("sub")
-        logger.info(f"JWT decoded successfully, username: {username}")
         if username is None:
-            logger.error("Username is None in JWT payload")
+            logger.debug("Username is None in JWT payload")
             return None
+        _jwt_cache[token] = (payload, payload.get("exp"))
         return payload
-    except JWTError as e:
-        logger.error(f"JWT verification failed: {e}")
+    except jwt.PyJWTError as e:
+        logger.debug("JWT verification failed: %s", e)
         return None
\ No newline at end of file
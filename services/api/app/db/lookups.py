@@ -0,0 +1,57 @@
+from typing import Optional
+from uuid import UUID
+from cachetools import TTLCache
+from sqlalchemy import bindparam, lambda_stmt
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlmodel import select
+from app.models.models import AIModel, Camera, User
+
+# Fixed-shape hot statements; lambda_stmt builds and compiles them once per process
+USER_BY_USERNAME = lambda_stmt(lambda: select(User).where(User.username == bindparam("username")))
+
+# Read-through caches for existence checks. Only hits are cached so a freshly
+# created row is never reported missing; deletes must call the invalidators.
+_model_exists_cache: TTLCache = TTLCache(maxsize=10_000, ttl=60)
+_camera_owner_cache: TTLCache = TTLCache(maxsize=10_000, ttl=60)
+_active_model_cache: TTLCache = TTLCache(maxsize=1, ttl=60)
+
+async def model_exists(db: AsyncSession, model_id: UUID) -> bool:
+    """Check that an AI model exists"""
+    if model_id in _model_exists_cache:
+        return True
+    result = await db.execute(select(AIModel.id).where(AIModel.id == model_id).limit(1))
+    if result.scalar_one_or_none() is None:
+        return False
+    _model_exists_cache[model_id] = True
+    return True
+
+async def camera_owned_by(db: AsyncSession, camera_id: UUID, owner_id: UUID) -> bool:
+    """Check that a camera exists and belongs to the given user"""
+    key = (camera_id, owner_id)
+    if key in _camera_owner_cache:
+        return True
+    result = await db.execute(
+        select(Camera.id).where(Camera.id == camera_id, Camera.owner_id == owner_id).limit(1)
+    )
+    if result.scalar_one_or_none() is None:
+        return False
+    _camera_owner_cache[key] = True
+    return True
+
+async def active_model_id(db: AsyncSession) -> Optional[UUID]:
+    """Id of an active AI model, or None if there is none"""
+    model_id = _active_model_cache.get("active")
+    if model_id is not None:
+        return model_id
+    result = await db.execute(select(AIModel.id).where(AIModel.is_active == True).limit(1))
+    model_id = result.scalar_one_or_none()
+    if model_id is not None:
+        _active_model_cache["active"] = model_id
+    return model_id
+
+def invalidate_model(model_id: UUID) -> None:
+    _model_exists_cache.pop(model_id, None)
+    _active_model_cache.clear()
+
+def invalidate_camera(camera_id: UUID, owner_id: UUID) -> None:
+    _camera_owner_cache.pop((camera_id, owner_id), None)
@@ -1,11 +1,31 @@
+import asyncio
+from sqlalchemy import Select, event
 from sqlalchemy.ext.asyncio import create_async_engine, AsyncSession, async_sessionmaker
+from sqlalchemy.orm import ORMExecuteState, Session, raiseload
 from app.core.config import settings
 
+def _engine_options(url: str) -> dict:
+    """Pool settings for server databases; SQLite keeps SQLAlchemy's defaults"""
+    if url.startswith("sqlite"):
+        return {}
+    options = {
+        "pool_size": settings.DB_POOL_SIZE,
+        "max_overflow": settings.DB_MAX_OVERFLOW,
+        "pool_timeout": settings.DB_POOL_TIMEOUT,
+        "pool_recycle": settings.DB_POOL_RECYCLE,
+        # No SELECT 1 per checkout; dead connections are caught by TCP keepalives
+        "pool_pre_ping": False,
+    }
+    if url.startswith("postgresql+asyncpg"):
+        options["connect_args"] = {"server_settings": {"tcp_keepalives_idle": "60"}}
+    return options
+
 # Create async engine
 engine = create_async_engine(
     settings.DATABASE_URL,
-    echo=True,  # Set to False in production
-    future=True
+    echo=settings.DB_ECHO,
+    future=True,
+    **_engine_options(settings.DATABASE_URL)
 )
 
 # Create async session factory
@@ -15,10 +35,43 @@ AsyncSessionLocal = async_sessionmaker(
     expire_on_commit=False
 )
 
+async def warm_up_pool() -> None:
+    """Open the pool's connections at startup so the first burst of sessions skips the connect handshake"""
+    if settings.DATABASE_URL.startswith("sqlite"):
+        return
+    # Hold all of them at once so the pool creates distinct connections, then return them
+    connections = await asyncio.gather(
+        *(engine.connect().start() for _ in range(settings.DB_POOL_SIZE)),
+        return_exceptions=True
+    )
+    await asyncio.gather(*(
+        connection.close() for connection in connections
+        if not isinstance(connection, BaseException)
+    ))
+
+def _loads_entities(statement: Select) -> bool:
+    return any(
+        isinstance(column["type"], type) and column["entity"] is column["type"]
+        for column in statement.column_descriptions
+    )
+
+if settings.DB_RAISE_ON_LAZY_LOAD:
+    @event.listens_for(Session, "do_orm_execute")
+    def _raise_on_lazy_load(state: ORMExecuteState) -> None:
+        """Default every entity SELECT to raiseload so a missing eager load fails loudly"""
+        if (
+            state.is_select
+            and not state.is_relationship_load
+            and isinstance(state.statement, Select)
+            and _loads_entities(state.statement)
+        ):
+            # Explicit selectinload/joinedload options in the statement take precedence
+            state.statement = state.statement.options(raiseload("*"))
+
 async def get_db():
     """Async database session dependency"""
     async with AsyncSessionLocal() as session:
         try:
             yield session
         finally:
-            await session.close()
\ No newline at end of file
+            await session.close()
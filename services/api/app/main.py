@@ -1,27 +1,36 @@
 from fastapi import FastAPI, Request
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import ORJSONResponse
 from contextlib import asynccontextmanager
 import asyncio
+import atexit
 import logging
+import queue
 import time
+from logging.handlers import QueueHandler, QueueListener
 from app.core.config import settings
-from app.core.security import create_access_token
-from app.db.session import engine
+from app.core.security import warm_up_password_hashing
+from app.db.session import engine, warm_up_pool
 from app.models import models
 from app.routers import auth, users, cameras, analytics, streams, websockets
-from app.services import consumer_service
 from app.services.detection_simulator import detection_simulator
 
-# Configure logging
-logging.basicConfig(level=logging.DEBUG, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+# Configure logging: handlers on the event loop only enqueue records; a
+# listener thread does the formatting and the stderr writes
+_log_queue: queue.SimpleQueue = queue.SimpleQueue()
+_log_handler = logging.StreamHandler()
+_log_handler.setFormatter(logging.Formatter('%(asctime)s - %(name)s - %(levelname)s - %(message)s'))
+_log_listener = QueueListener(_log_queue, _log_handler, respect_handler_level=True)
+_queue_handler = QueueHandler(_log_queue)
+# QueueHandler.prepare() formats once to merge args; keep that to the bare message
+_queue_handler.setFormatter(logging.Formatter('%(message)s'))
+logging.basicConfig(level=settings.LOG_LEVEL.upper(), handlers=[_queue_handler])
+_log_listener.start()
+# Stopped only at interpreter exit: records from uvicorn's own shutdown still get
+# written, and a second lifespan in the same process (tests, reload) keeps logging
+atexit.register(_log_listener.stop)
 logger = logging.getLogger(__name__)
 
-# Set debug logging for our modules
-logging.getLogger("app.core.dependencies").setLevel(logging.DEBUG)
-logging.getLogger("app.core.security").setLevel(logging.DEBUG)
-logging.getLogger("app.routers.cameras").setLevel(logging.DEBUG)
-logging.getLogger("uvicorn.access").setLevel(logging.DEBUG)
-
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     """Manage application lifecycle"""
@@ -32,7 +41,15 @@ async def lifespan(app: FastAPI):
     async with engine.begin() as conn:
         await conn.run_sync(models.SQLModel.metadata.create_all)
     
-    # Start background consumer service
+    # Open pooled DB connections before the consumer and simulator need them
+    await warm_up_pool()
+    
+    # Warm bcrypt and the default executor thread used by login/register
+    await asyncio.to_thread(warm_up_password_hashing)
+    
+    # Start background consumer service (imported here so the Pulsar client
+    # library is only loaded by a serving process, not on every app import)
+    from app.services import consumer_service
     consumer_task = asyncio.create_task(consumer_service.consume_metadata())
     
     # Start detection simulator for real-time object detection
@@ -67,30 +84,34 @@ app = FastAPI(
     title="Aries Edge Platform API",
     description="Multi-camera intelligent video analytics platform",
     version="1.0.0",
-    lifespan=lifespan
+    lifespan=lifespan,
+    default_response_class=ORJSONResponse
 )
 
 # Add debug middleware to log all requests
 @app.middleware("http")
 async def log_requests(request: Request, call_next):
+    if not logger.isEnabledFor(logging.DEBUG):
+        return await call_next(request)
+
     start_time = time.time()
     
     # Log request details
-    logger.info(f"=== INCOMING REQUEST ===")
-    logger.info(f"Method: {request.method}")
-    logger.info(f"URL: {request.url}")
-    logger.info(f"Headers: {dict(request.headers)}")
+    logger.debug("=== INCOMING REQUEST ===")
+    logger.debug("Method: %s", request.method)
+    logger.debug("URL: %s", request.url)
+    logger.debug("Headers: %s", request.headers)
     
     try:
         response = await call_next(request)
         process_time = time.time() - start_time
-        logger.info(f"=== RESPONSE ===")
-        logger.info(f"Status Code: {response.status_code}")
-        logger.info(f"Process Time: {process_time:.3f}s")
+        logger.debug("=== RESPONSE ===")
+        logger.debug("Status Code: %s", response.status_code)
+        logger.debug("Process Time: %.3fs", process_time)
         return response
     except Exception as e:
-        logger.error(f"=== REQUEST ERROR ===")
-        logger.error(f"Error: {type(e).__name__}: {str(e)}", exc_info=True)
+        logger.error("=== REQUEST ERROR ===")
+        logger.error("Error: %s: %s", type(e).__name__, e, exc_info=True)
         raise
 
 # Configure CORS
@@ -100,23 +121,24 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],  # Allow all methods
     allow_headers=["*"],  # Allow all headers
+    expose_headers=["X-Next-Cursor"],  # Pagination cursor for GET /analytics/jobs
 )
 
 # Include routers - order matters! More specific paths first
-print("DEBUG: Including auth router...")
+logger.debug("Including auth router...")
 app.include_router(auth.router, prefix="/auth", tags=["authentication"])
-print("DEBUG: Including users router...")
+logger.debug("Including users router...")
 app.include_router(users.router, prefix="/users", tags=["users"])
-print("DEBUG: Including cameras router...")
+logger.debug("Including cameras router...")
 app.include_router(cameras.router, prefix="/cameras", tags=["cameras"])
-print("DEBUG: Including analytics router...")
+logger.debug("Including analytics router...")
 app.include_router(analytics.router, prefix="/analytics", tags=["analytics"])
-print("DEBUG: Including websockets router...")
+logger.debug("Including websockets router...")
 app.include_router(websockets.router, prefix="/ws", tags=["websockets"])
 # Include streams router last to avoid conflicts with camera-specific endpoints
-print("DEBUG: Including streams router...")
+logger.debug("Including streams router...")
 app.include_router(streams.router, prefix="/streams", tags=["streams"])
-print("DEBUG: All routers included successfully")
+logger.debug("All routers included successfully")
 
 @app.get("/")
 async def root():
@@ -128,5 +150,12 @@ async def health_check():
 
 @app.get("/test-cameras")
 async def test_cameras():
-    logger.info("=== TEST CAMERAS ENDPOINT CALLED ===")
-    return {"message": "Test cameras endpoint working"}
\ No newline at end of file
+    logger.debug("Test cameras endpoint called")
+    return {"message": "Test cameras endpoint working"}
+
+if __name__ == "__main__":
+    import uvicorn
+
+    # uvloop replaces the default selector loop for both the HTTP server and
+    # the background consumer/simulator tasks started in lifespan
+    uvicorn.run("app.main:app", host="0.0.0.0", port=8000, loop="uvloop", http="httptools")
@@ -1,21 +1,64 @@
 from sqlmodel import SQLModel, Field, Relationship
+from sqlalchemy import JSON, CheckConstraint, Column, DateTime, Index, func, text
+from sqlalchemy.dialects.postgresql import JSONB
 from typing import Optional, List, Dict, Any
 from datetime import datetime
-from uuid import UUID, uuid4
+from uuid import UUID
+import os
+import time
+
+# Native JSONB on Postgres, JSON text elsewhere (SQLite in development)
+JSONType = JSON().with_variant(JSONB(), "postgresql")
+
+# Allowed values for the short status/type columns, enforced by CHECK constraints
+USER_ROLES = ("admin", "operator", "viewer")
+USER_STATUSES = ("active", "inactive", "suspended")
+CAMERA_TYPES = ("ip", "usb", "rtsp", "file")
+CAMERA_STATUSES = ("online", "offline", "error", "recording")
+STREAM_TYPES = ("hls", "webrtc", "rtmp")
+STREAM_STATUSES = ("idle", "streaming", "error", "stopped")
+STREAM_QUALITIES = ("low", "medium", "high", "ultra")
+
+def _active_only(name: str, *columns: str) -> Index:
+    """Partial index over is_active rows only; small, and matches the hot filters"""
+    return Index(name, *columns, postgresql_where=text("is_active"), sqlite_where=text("is_active"))
+
+def _one_of(table: str, column: str, values: tuple) -> CheckConstraint:
+    allowed = ", ".join(f"'{value}'" for value in values)
+    return CheckConstraint(f"{column} IN ({allowed})", name=f"ck_{table}_{column}")
+
+def _stamped_on_insert() -> Any:
+    """TIMESTAMPTZ column filled by the database on INSERT (returned via eager_defaults)"""
+    return Field(
+        default=None,
+        sa_column=Column(DateTime(timezone=True), server_default=func.now(), nullable=False)
+    )
+
+def uuid7() -> UUID:
+    """Time-ordered UUID (RFC 9562 version 7) so new primary keys land on the rightmost B-tree page"""
+    value = (time.time_ns() // 1_000_000) << 80 | int.from_bytes(os.urandom(10), "big")
+    value = (value & ~(0xF << 76)) | (0x7 << 76)
+    value = (value & ~(0x3 << 62)) | (0x2 << 62)
+    return UUID(int=value)
 
 class User(SQLModel, table=True):
     """Simplified User model"""
     __tablename__ = "users"
+    __mapper_args__ = {"eager_defaults": True}
+    __table_args__ = (
+        _one_of("users", "role", USER_ROLES),
+        _one_of("users", "status", USER_STATUSES),
+    )
     
-    id: UUID = Field(default_factory=uuid4, primary_key=True)
+    id: UUID = Field(default_factory=uuid7, primary_key=True)
     username: str = Field(unique=True, index=True)
     email: str = Field(unique=True, index=True)
     hashed_password: str
     full_name: Optional[str] = None
-    role: str = Field(default="viewer")
-    status: str = Field(default="active")
+    role: str = Field(default="viewer", max_length=16)
+    status: str = Field(default="active", max_length=16)
     is_active: bool = Field(default=True)
-    created_at: datetime = Field(default_factory=datetime.utcnow)
+    created_at: Optional[datetime] = _stamped_on_insert()
     updated_at: Optional[datetime] = None
     
     # Relationships
@@ -25,16 +68,25 @@ class User(SQLModel, table=True):
 class Camera(SQLModel, table=True):
     """Simplified Camera model"""
     __tablename__ = "cameras"
-    
-    id: UUID = Field(default_factory=uuid4, primary_key=True)
+    __mapper_args__ = {"eager_defaults": True}
+    __table_args__ = (
+        _one_of("cameras", "type", CAMERA_TYPES),
+        _one_of("cameras", "status", CAMERA_STATUSES),
+        # Owner-scoped lookups by id; also serves plain owner_id lookups
+        Index("ix_cameras_owner_id_id", "owner_id", "id"),
+        # Detection simulator: online, active cameras
+        _active_only("ix_cameras_status_active", "status"),
+    )
+    
+    id: UUID = Field(default_factory=uuid7, primary_key=True)
     name: str = Field(index=True)
-    type: str = Field(default="rtsp")
+    type: str = Field(default="rtsp", max_length=16)
     url: str
     description: Optional[str] = None
     location: Optional[str] = None
-    status: str = Field(default="offline")
+    status: str = Field(default="offline", max_length=16)
     is_active: bool = Field(default=True)
-    created_at: datetime = Field(default_factory=datetime.utcnow)
+    created_at: Optional[datetime] = _stamped_on_insert()
     updated_at: Optional[datetime] = None
     
     # Foreign keys
@@ -48,15 +100,21 @@ class Camera(SQLModel, table=True):
 class Stream(SQLModel, table=True):
     """Stream configuration"""
     __tablename__ = "streams"
-    
-    id: UUID = Field(default_factory=uuid4, primary_key=True)
-    camera_id: UUID = Field(foreign_key="cameras.id")
-    type: str = Field(default="hls")
-    status: str = Field(default="idle")
+    __mapper_args__ = {"eager_defaults": True}
+    __table_args__ = (
+        _one_of("streams", "type", STREAM_TYPES),
+        _one_of("streams", "status", STREAM_STATUSES),
+        _one_of("streams", "quality", STREAM_QUALITIES),
+    )
+    
+    id: UUID = Field(default_factory=uuid7, primary_key=True)
+    camera_id: UUID = Field(foreign_key="cameras.id", index=True)
+    type: str = Field(default="hls", max_length=16)
+    status: str = Field(default="idle", max_length=16)
     endpoint: str
-    quality: str = Field(default="medium")
+    quality: str = Field(default="medium", max_length=16)
     metadata_enabled: bool = Field(default=True)
-    created_at: datetime = Field(default_factory=datetime.utcnow)
+    created_at: Optional[datetime] = _stamped_on_insert()
     updated_at: Optional[datetime] = None
     
     # Relationships
@@ -65,17 +123,18 @@ class Stream(SQLModel, table=True):
 class AIModel(SQLModel, table=True):
     """AI Model configuration"""
     __tablename__ = "ai_models"
+    __mapper_args__ = {"eager_defaults": True}
     
-    id: UUID = Field(default_factory=uuid4, primary_key=True)
+    id: UUID = Field(default_factory=uuid7, primary_key=True)
     name: str = Field(unique=True, index=True)
     version: str
-    ai_model_type: str = Field(default="yolov8")
+    ai_model_type: str = Field(default="yolov8", max_length=32)
     config_path: str
     weights_path: str
     labels_path: str
     description: Optional[str] = None
     is_active: bool = Field(default=True)
-    created_at: datetime = Field(default_factory=datetime.utcnow)
+    created_at: Optional[datetime] = _stamped_on_insert()
     updated_at: Optional[datetime] = None
     
     # Relationships
@@ -84,20 +143,28 @@ class AIModel(SQLModel, table=True):
 class AnalyticsJob(SQLModel, table=True):
     """Analytics job configuration"""
     __tablename__ = "analytics_jobs"
-    
-    id: UUID = Field(default_factory=uuid4, primary_key=True)
+    __mapper_args__ = {"eager_defaults": True}
+    __table_args__ = (
+        # Keyset pagination for GET /analytics/jobs (uuid7 ids are time-ordered);
+        # also serves plain created_by_id lookups
+        Index("ix_analytics_jobs_created_by_id_id", "created_by_id", "id"),
+        # Active job lookup per camera
+        _active_only("ix_analytics_jobs_camera_id_active", "camera_id"),
+    )
+    
+    id: UUID = Field(default_factory=uuid7, primary_key=True)
     name: str
     description: Optional[str] = None
     is_active: bool = Field(default=True)
     confidence_threshold: float = Field(default=0.5)
     nms_threshold: float = Field(default=0.4)
     max_detections: int = Field(default=100)
-    created_at: datetime = Field(default_factory=datetime.utcnow)
+    created_at: Optional[datetime] = _stamped_on_insert()
     updated_at: Optional[datetime] = None
     
     # Foreign keys
-    camera_id: UUID = Field(foreign_key="cameras.id")
-    ai_model_id: UUID = Field(foreign_key="ai_models.id")
+    camera_id: UUID = Field(foreign_key="cameras.id", index=True)
+    ai_model_id: UUID = Field(foreign_key="ai_models.id", index=True)
     created_by_id: UUID = Field(foreign_key="users.id")
     
     # Relationships
@@ -109,20 +176,21 @@ class AnalyticsJob(SQLModel, table=True):
 class ROI(SQLModel, table=True):
     """Region of Interest"""
     __tablename__ = "rois"
+    __mapper_args__ = {"eager_defaults": True}
     
-    id: UUID = Field(default_factory=uuid4, primary_key=True)
+    id: UUID = Field(default_factory=uuid7, primary_key=True)
     name: str
-    polygon_points: str = Field(default="[]")  # JSON string for polygon points
+    polygon_points: List[Dict[str, float]] = Field(default_factory=list, sa_column=Column(JSONType, nullable=False))
     roi_type: str = Field(default="zone")
     description: Optional[str] = None
     is_active: bool = Field(default=True)
     alert_on_entry: bool = Field(default=True)
     alert_on_exit: bool = Field(default=False)
-    created_at: datetime = Field(default_factory=datetime.utcnow)
+    created_at: Optional[datetime] = _stamped_on_insert()
     updated_at: Optional[datetime] = None
     
     # Foreign keys
-    analytics_job_id: UUID = Field(foreign_key="analytics_jobs.id")
+    analytics_job_id: UUID = Field(foreign_key="analytics_jobs.id", index=True)
     
     # Relationships
     analytics_job: AnalyticsJob = Relationship(back_populates="rois")
@@ -130,24 +198,33 @@ class ROI(SQLModel, table=True):
 class AlertEvent(SQLModel, table=True):
     """Alert events"""
     __tablename__ = "alert_events"
-    
-    id: UUID = Field(default_factory=uuid4, primary_key=True)
-    timestamp: datetime = Field(default_factory=datetime.utcnow)
-    alert_type: str = Field(default="object_detected")
+    __mapper_args__ = {"eager_defaults": True}
+    __table_args__ = (
+        # Per-camera time-range scans (detection stats); also serves plain camera_id lookups.
+        # On Postgres the stats aggregate reads class/confidence from the index alone
+        Index(
+            "ix_alert_events_camera_id_timestamp", "camera_id", "timestamp",
+            postgresql_include=["object_class", "confidence"]
+        ),
+    )
+    
+    id: UUID = Field(default_factory=uuid7, primary_key=True)
+    timestamp: Optional[datetime] = _stamped_on_insert()
+    alert_type: str = Field(default="object_detected", max_length=32)
     confidence: float
-    object_class: str
+    object_class: str = Field(max_length=32)
     object_id: Optional[str] = None
     bbox_x: float
     bbox_y: float
     bbox_width: float
     bbox_height: float
     snapshot_path: Optional[str] = None
-    event_metadata: Optional[str] = None  # JSON string for metadata
+    event_metadata: Optional[Dict[str, Any]] = Field(default=None, sa_column=Column(JSONType))
     processed: bool = Field(default=False)
     
     # Foreign keys
     camera_id: UUID = Field(foreign_key="cameras.id")
-    analytics_job_id: UUID = Field(foreign_key="analytics_jobs.id")
+    analytics_job_id: UUID = Field(foreign_key="analytics_jobs.id", index=True)
     
     # Relationships
     camera: Camera = Relationship()
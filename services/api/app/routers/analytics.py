@@ -1,38 +1,88 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, Query, status
+from fastapi.responses import ORJSONResponse
+from sqlalchemy import insert
 from sqlalchemy.ext.asyncio import AsyncSession
-from typing import List
-from app.core.dependencies import get_current_active_user
+from sqlalchemy.orm import raiseload, selectinload
+from typing import List, Optional
+from uuid import UUID
+from app.core.dependencies import get_current_active_user, get_current_db_user
 from app.db.session import get_db
-from app.models.models import User, AnalyticsJob, AIModel, ROI
+from app.db.lookups import camera_owned_by, model_exists
+from app.models.models import User, AnalyticsJob, ROI, uuid7
 from app.schemas.analytics import AnalyticsJobCreate, AnalyticsJobResponse, ROICreate, ROIResponse
 from sqlmodel import select
+import base64
 
 router = APIRouter()
 
+# Largest page GET /analytics/jobs will return
+MAX_JOBS_PAGE = 500
+
+def _job_payload(job: AnalyticsJob) -> dict:
+    """Project an AnalyticsJob row onto the AnalyticsJobResponse shape without re-validating it"""
+    return {
+        "id": job.id,
+        "name": job.name,
+        "description": job.description,
+        "camera_id": job.camera_id,
+        "model_id": job.ai_model_id,
+        "confidence_threshold": job.confidence_threshold,
+        "nms_threshold": job.nms_threshold,
+        "max_detections": job.max_detections,
+        "is_active": job.is_active,
+        "created_at": job.created_at,
+        "updated_at": job.updated_at,
+    }
+
+def _encode_cursor(job: AnalyticsJob) -> str:
+    """Opaque keyset cursor for the position after `job`.
+    
+    Ids are uuid7, so they sort in creation order on their own; created_at is
+    not used because SQLite stores it at one-second resolution.
+    """
+    return base64.urlsafe_b64encode(job.id.bytes).decode()
+
+def _decode_cursor(cursor: str) -> UUID:
+    try:
+        return UUID(bytes=base64.urlsafe_b64decode(cursor.encode()))
+    except (ValueError, TypeError):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Invalid cursor"
+        )
+
+def _roi_payload(roi: ROI) -> dict:
+    """Project an ROI row onto the ROIResponse shape without re-validating it"""
+    return {
+        "id": roi.id,
+        "name": roi.name,
+        "polygon_points": roi.polygon_points,
+        "roi_type": roi.roi_type,
+        "analytics_job_id": roi.analytics_job_id,
+        "description": roi.description,
+        "alert_on_entry": roi.alert_on_entry,
+        "alert_on_exit": roi.alert_on_exit,
+        "is_active": roi.is_active,
+        "created_at": roi.created_at,
+        "updated_at": roi.updated_at,
+    }
+
 @router.post("/jobs", response_model=AnalyticsJobResponse)
 async def create_analytics_job(
     job: AnalyticsJobCreate,
-    current_user: dict = Depends(get_current_active_user),
+    user: User = Depends(get_current_db_user),
     db: AsyncSession = Depends(get_db)
 ):
     """Create a new analytics job"""
-    # Get current user ID
-    result = await db.execute(select(User).where(User.username == current_user["username"]))
-    user = result.scalar_one()
-    
     # Verify camera belongs to user
-    camera_result = await db.execute(
-        select(AnalyticsJob).where(AnalyticsJob.camera_id == job.camera_id)
-    )
-    if not camera_result.scalar_one_or_none():
+    if not await camera_owned_by(db, job.camera_id, user.id):
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Camera not found"
         )
     
     # Verify model exists
-    model_result = await db.execute(select(AIModel).where(AIModel.id == job.model_id))
-    if not model_result.scalar_one_or_none():
+    if not await model_exists(db, job.model_id):
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Model not found"
@@ -43,7 +93,7 @@ async def create_analytics_job(
         name=job.name,
         description=job.description,
         camera_id=job.camera_id,
-        model_id=job.model_id,
+        ai_model_id=job.model_id,
         created_by_id=user.id,
         confidence_threshold=job.confidence_threshold,
         nms_threshold=job.nms_threshold,
@@ -52,32 +102,39 @@ async def create_analytics_job(
     
     db.add(db_job)
     await db.commit()
-    await db.refresh(db_job)
     
-    return db_job
+    # The row has ai_model_id; the response calls it model_id
+    return ORJSONResponse(content=_job_payload(db_job))
 
 @router.get("/jobs", response_model=List[AnalyticsJobResponse])
 async def read_analytics_jobs(
-    skip: int = 0,
-    limit: int = 100,
-    current_user: dict = Depends(get_current_active_user),
+    cursor: Optional[str] = None,
+    limit: int = Query(100, ge=1, le=MAX_JOBS_PAGE),
+    user: User = Depends(get_current_db_user),
     db: AsyncSession = Depends(get_db)
 ):
-    """Get list of analytics jobs"""
-    # Get current user ID
-    result = await db.execute(select(User).where(User.username == current_user["username"]))
-    user = result.scalar_one()
-    
-    # Query jobs created by user
-    result = await db.execute(
+    """
+    Get list of analytics jobs, newest first.
+    Pass the X-Next-Cursor response header back as `cursor` to fetch the next page.
+    """
+    # Query jobs created by user; the response is column-only, so any
+    # relationship access would be a per-row lazy load and must fail loudly
+    query = (
         select(AnalyticsJob)
+        .options(raiseload("*"))
         .where(AnalyticsJob.created_by_id == user.id)
-        .offset(skip)
+    )
+    if cursor:
+        query = query.where(AnalyticsJob.id < _decode_cursor(cursor))
+    result = await db.execute(
+        query
+        .order_by(AnalyticsJob.id.desc())
         .limit(limit)
     )
     jobs = result.scalars().all()
     
-    return jobs
+    headers = {"X-Next-Cursor": _encode_cursor(jobs[-1])} if len(jobs) == limit else None
+    return ORJSONResponse(content=[_job_payload(job) for job in jobs], headers=headers)
 
 @router.post("/roi", response_model=ROIResponse)
 async def create_roi(
@@ -111,20 +168,62 @@ async def create_roi(
     
     db.add(db_roi)
     await db.commit()
-    await db.refresh(db_roi)
     
     return db_roi
 
+@router.post("/roi/batch", response_model=List[ROIResponse])
+async def create_rois_batch(
+    rois: List[ROICreate],
+    user: User = Depends(get_current_db_user),
+    db: AsyncSession = Depends(get_db)
+):
+    """Create several Regions of Interest in one INSERT"""
+    if not rois:
+        return ORJSONResponse(content=[])
+    
+    # Verify every referenced job exists and belongs to user in one query
+    job_ids = {roi.analytics_job_id for roi in rois}
+    result = await db.execute(
+        select(AnalyticsJob.id).where(
+            AnalyticsJob.id.in_(job_ids),
+            AnalyticsJob.created_by_id == user.id
+        )
+    )
+    if set(result.scalars().all()) != job_ids:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Analytics job not found"
+        )
+    
+    # Bulk insert through Core; no per-object unit-of-work bookkeeping
+    rows = [
+        {**roi.model_dump(), "id": uuid7(), "is_active": True}
+        for roi in rois
+    ]
+    result = await db.execute(
+        insert(ROI).returning(ROI.created_at, sort_by_parameter_order=True),
+        rows
+    )
+    created = result.scalars().all()
+    await db.commit()
+    
+    return ORJSONResponse(content=[
+        {**row, "created_at": created_at, "updated_at": None}
+        for row, created_at in zip(rows, created)
+    ])
+
 @router.get("/roi/{job_id}", response_model=List[ROIResponse])
 async def read_rois_for_job(
-    job_id: int,
-    current_user: dict = Depends(get_current_active_user),
+    job_id: UUID,
+    user: User = Depends(get_current_db_user),
     db: AsyncSession = Depends(get_db)
 ):
     """Get all ROIs for an analytics job"""
-    # Verify job exists
+    # Load the user's job and its ROIs together
     result = await db.execute(
-        select(AnalyticsJob).where(AnalyticsJob.id == job_id)
+        select(AnalyticsJob)
+        .options(selectinload(AnalyticsJob.rois), raiseload("*"))
+        .where(AnalyticsJob.id == job_id, AnalyticsJob.created_by_id == user.id)
     )
     job = result.scalar_one_or_none()
     
@@ -134,10 +233,4 @@ async def read_rois_for_job(
             detail="Analytics job not found"
         )
     
-    # Query ROIs
-    result = await db.execute(
-        select(ROI).where(ROI.analytics_job_id == job_id)
-    )
-    rois = result.scalars().all()
-    
-    return rois
\ No newline at end of file
+    return ORJSONResponse(content=[_roi_payload(roi) for roi in job.rois])
\ No newline at end of file
@@ -1,11 +1,14 @@
 from fastapi import APIRouter, Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordRequestForm
+from sqlalchemy import or_
 from sqlalchemy.ext.asyncio import AsyncSession
 from datetime import timedelta
+import asyncio
 from app.core.config import settings
 from app.core.security import create_access_token, verify_password, get_password_hash
-from app.core.dependencies import get_current_user_or_machine
+from app.core.dependencies import get_current_user_or_machine, get_current_db_user
 from app.db.session import get_db
+from app.db.lookups import USER_BY_USERNAME
 from app.models.models import User
 from app.schemas.auth import Token, UserCreate, UserResponse
 from sqlmodel import select
@@ -19,10 +22,10 @@ async def login_for_access_token(
 ):
     """OAuth2 token endpoint for user authentication"""
     # Query user by username
-    result = await db.execute(select(User).where(User.username == form_data.username))
+    result = await db.execute(USER_BY_USERNAME, {"username": form_data.username})
     user = result.scalar_one_or_none()
     
-    if not user or not verify_password(form_data.password, user.hashed_password):
+    if not user or not await asyncio.to_thread(verify_password, form_data.password, user.hashed_password):
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Incorrect username or password",
@@ -37,7 +40,7 @@ async def login_for_access_token(
     
     access_token_expires = timedelta(minutes=settings.ACCESS_TOKEN_EXPIRE_MINUTES)
     access_token = create_access_token(
-        data={"sub": user.username}, expires_delta=access_token_expires
+        data={"sub": user.username, "uid": str(user.id)}, expires_delta=access_token_expires
     )
     
     return {"access_token": access_token, "token_type": "bearer"}
@@ -48,24 +51,26 @@ async def register_user(
     db: AsyncSession = Depends(get_db)
 ):
     """Register a new user"""
-    # Check if username already exists
-    result = await db.execute(select(User).where(User.username == user_create.username))
-    if result.scalar_one_or_none():
+    # Check username and email uniqueness in one round trip
+    result = await db.execute(
+        select(User.username, User.email)
+        .where(or_(User.username == user_create.username, User.email == user_create.email))
+        .limit(2)
+    )
+    existing = result.all()
+    if any(row.username == user_create.username for row in existing):
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail="Username already registered"
         )
-    
-    # Check if email already exists
-    result = await db.execute(select(User).where(User.email == user_create.email))
-    if result.scalar_one_or_none():
+    if existing:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail="Email already registered"
         )
     
     # Create new user
-    hashed_password = get_password_hash(user_create.password)
+    hashed_password = await asyncio.to_thread(get_password_hash, user_create.password)
     user = User(
         username=user_create.username,
         email=user_create.email,
@@ -76,21 +81,15 @@ async def register_user(
     
     db.add(user)
     await db.commit()
-    await db.refresh(user)
     
     return user
 
 @router.get("/me", response_model=UserResponse)
 async def read_users_me(
-    current_user: dict = Depends(get_current_user_or_machine)
+    user: User = Depends(get_current_db_user)
 ):
     """Get current user information"""
-    if current_user["type"] != "user":
-        raise HTTPException(
-            status_code=status.HTTP_403_FORBIDDEN,
-            detail="User authentication required"
-        )
-    return current_user["payload"]
+    return user
 
 @router.post("/logout")
 async def logout(
@@ -1,11 +1,15 @@
 from fastapi import APIRouter, Depends, HTTPException, status, BackgroundTasks
+from fastapi.responses import ORJSONResponse
+from cachetools import TTLCache
+from sqlalchemy import bindparam, lambda_stmt
 from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import raiseload
 from typing import List, Optional
-from pathlib import Path
 from uuid import UUID
-from app.core.dependencies import get_current_active_user
+from app.core.dependencies import get_current_user_id
 from app.db.session import get_db
-from app.models.models import User, Camera, AIModel
+from app.db.lookups import USER_BY_USERNAME, invalidate_camera
+from app.models.models import Camera, AIModel
 from app.schemas.camera import CameraCreate, CameraResponse, CameraUpdate
 from app.services.mock_stream_processor import mock_stream_processor
 from app.core.config import settings
@@ -18,43 +22,70 @@ logger = logging.getLogger(__name__)
 
 router = APIRouter()
 
+# Fixed-shape statements built once; handlers only bind parameters
+_CAMERA_BY_ID_OWNER = lambda_stmt(
+    lambda: select(Camera)
+    .options(raiseload("*"))
+    .where(Camera.id == bindparam("camera_id"), Camera.owner_id == bindparam("owner_id"))
+)
+_CAMERAS_PAGE = lambda_stmt(
+    lambda: select(Camera)
+    .options(raiseload("*"))
+    .offset(bindparam("skip"))
+    .limit(bindparam("limit"))
+)
+
+# Polled stream status per camera, stored with the owner it was resolved for.
+# The TTL is about one HLS segment; start/stop/update/delete evict the entry.
+_stream_status_cache: TTLCache = TTLCache(maxsize=4096, ttl=2)
+
+def _camera_payload(camera: Camera) -> dict:
+    """Project a Camera row onto the CameraResponse shape without re-validating it"""
+    return {
+        "id": camera.id,
+        "name": camera.name,
+        "url": camera.url,
+        "description": camera.description,
+        "location": camera.location,
+        "is_active": camera.is_active,
+        "created_at": camera.created_at,
+    }
+
+async def get_owned_camera(db: AsyncSession, camera_id: UUID, owner_id: UUID) -> Camera:
+    """Fetch a camera owned by `owner_id` in one query, or raise 404"""
+    result = await db.execute(_CAMERA_BY_ID_OWNER, {"camera_id": camera_id, "owner_id": owner_id})
+    camera = result.scalar_one_or_none()
+    if not camera:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Camera not found"
+        )
+    return camera
+
 @router.get("/test")
 async def test_cameras_router():
     """Test endpoint to verify cameras router is working"""
-    logger.info("=== TEST_CAMERAS_ROUTER CALLED ===")
+    logger.debug("Cameras router test endpoint called")
     return {"message": "Cameras router is working"}
 
 @router.post("/", response_model=CameraResponse)
 async def create_camera(
     camera: CameraCreate,
-    current_user: dict = Depends(get_current_active_user),
+    user_id: UUID = Depends(get_current_user_id),
     db: AsyncSession = Depends(get_db)
 ):
     """Create a new camera configuration"""
-    # Get current user ID
-    logger.info(f"Looking up user with username: {current_user['username']}")
-    result = await db.execute(select(User).where(User.username == current_user["username"]))
-    user = result.scalar_one_or_none()
-    if not user:
-        logger.error(f"User {current_user['username']} not found in database")
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail="User not found"
-        )
-    logger.info(f"Found user: {user.id} - {user.username}")
-    
     # Create camera
     db_camera = Camera(
         name=camera.name,
         url=camera.rtsp_uri,
         description=camera.description,
         location=camera.location,
-        owner_id=user.id
+        owner_id=user_id
     )
     
     db.add(db_camera)
     await db.commit()
-    await db.refresh(db_camera)
     
     return db_camera
 
@@ -65,127 +96,63 @@ async def read_cameras(
     db: AsyncSession = Depends(get_db)
 ):
     """Get list of cameras for the current user"""
-    logger.info("=== READ_CAMERAS FUNCTION CALLED ===")
-    
     try:
-        # Query all cameras (for testing)
-        result = await db.execute(select(Camera).offset(skip).limit(limit))
+        # Query all cameras (for testing); the payload is column-only, so
+        # relationships are never loaded
+        result = await db.execute(_CAMERAS_PAGE, {"skip": skip, "limit": limit})
         cameras = result.scalars().all()
         
-        logger.info(f"Found {len(cameras)} cameras")
-        return cameras
+        logger.debug("Found %d cameras", len(cameras))
+        return ORJSONResponse(content=[_camera_payload(camera) for camera in cameras])
     except Exception as e:
-        logger.error(f"Error in read_cameras: {type(e).__name__}: {str(e)}", exc_info=True)
+        logger.error("Error in read_cameras: %s: %s", type(e).__name__, e, exc_info=True)
         raise
 
 @router.get("/{camera_id}", response_model=CameraResponse)
 async def read_camera(
     camera_id: UUID,
-    current_user: dict = Depends(get_current_active_user),
+    user_id: UUID = Depends(get_current_user_id),
     db: AsyncSession = Depends(get_db)
 ):
     """Get a specific camera by ID"""
-    # Get current user ID
-    logger.info(f"Looking up user with username: {current_user['username']}")
-    result = await db.execute(select(User).where(User.username == current_user["username"]))
-    user = result.scalar_one_or_none()
-    if not user:
-        logger.error(f"User {current_user['username']} not found in database")
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail="User not found"
-        )
-    logger.info(f"Found user: {user.id} - {user.username}")
+    camera = await get_owned_camera(db, camera_id, user_id)
     
-    # Query camera
-    result = await db.execute(
-        select(Camera).where(Camera.id == camera_id, Camera.owner_id == user.id)
-    )
-    camera = result.scalar_one_or_none()
-    
-    if not camera:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail="Camera not found"
-        )
-    
-    return camera
+    return ORJSONResponse(content=_camera_payload(camera))
 
 @router.put("/{camera_id}", response_model=CameraResponse)
 async def update_camera(
     camera_id: UUID,
     camera_update: CameraUpdate,
-    current_user: dict = Depends(get_current_active_user),
+    user_id: UUID = Depends(get_current_user_id),
     db: AsyncSession = Depends(get_db)
 ):
     """Update a camera configuration"""
-    # Get current user ID
-    logger.info(f"Looking up user with username: {current_user['username']}")
-    result = await db.execute(select(User).where(User.username == current_user["username"]))
-    user = result.scalar_one_or_none()
-    if not user:
-        logger.error(f"User {current_user['username']} not found in database")
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail="User not found"
-        )
-    logger.info(f"Found user: {user.id} - {user.username}")
-    
-    # Query camera
-    result = await db.execute(
-        select(Camera).where(Camera.id == camera_id, Camera.owner_id == user.id)
-    )
-    camera = result.scalar_one_or_none()
-    
-    if not camera:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail="Camera not found"
-        )
+    camera = await get_owned_camera(db, camera_id, user_id)
     
     # Update fields
-    update_data = camera_update.dict(exclude_unset=True)
+    update_data = camera_update.model_dump(exclude_unset=True)
     for field, value in update_data.items():
         setattr(camera, field, value)
     
     await db.commit()
     await db.refresh(camera)
+    _stream_status_cache.pop(camera_id, None)
     
     return camera
 
 @router.delete("/{camera_id}")
 async def delete_camera(
     camera_id: UUID,
-    current_user: dict = Depends(get_current_active_user),
+    user_id: UUID = Depends(get_current_user_id),
     db: AsyncSession = Depends(get_db)
 ):
     """Delete a camera configuration"""
-    # Get current user ID
-    logger.info(f"Looking up user with username: {current_user['username']}")
-    result = await db.execute(select(User).where(User.username == current_user["username"]))
-    user = result.scalar_one_or_none()
-    if not user:
-        logger.error(f"User {current_user['username']} not found in database")
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail="User not found"
-        )
-    logger.info(f"Found user: {user.id} - {user.username}")
-    
-    # Query camera
-    result = await db.execute(
-        select(Camera).where(Camera.id == camera_id, Camera.owner_id == user.id)
-    )
-    camera = result.scalar_one_or_none()
-    
-    if not camera:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail="Camera not found"
-        )
+    camera = await get_owned_camera(db, camera_id, user_id)
     
     await db.delete(camera)
     await db.commit()
+    invalidate_camera(camera.id, user_id)
+    _stream_status_cache.pop(camera_id, None)
     
     return {"message": "Camera deleted successfully"}
 
@@ -196,63 +163,37 @@ async def start_camera_stream(
     db: AsyncSession = Depends(get_db)
 ):
     """Start video stream processing for a camera"""
-    import logging
-    logger = logging.getLogger(__name__)
-    
-    logger.info(f"=== START_CAMERA_STREAM CALLED WITH camera_id={camera_id} ===")
-    
     try:
         # Hardcoded user for testing
-        logger.info(f"Starting stream for camera {camera_id} (auth bypassed for testing)")
+        logger.debug("Starting stream for camera %s (auth bypassed for testing)", camera_id)
         
         # Get current user ID (hardcoded for testing)
-        logger.info(f"Looking up user with username: demo")
-        result = await db.execute(select(User).where(User.username == "demo"))
+        result = await db.execute(USER_BY_USERNAME, {"username": "demo"})
         user = result.scalar_one_or_none()
         if not user:
-            logger.error(f"User demo not found in database")
+            logger.error("User demo not found in database")
             raise HTTPException(
                 status_code=status.HTTP_404_NOT_FOUND,
                 detail="User not found"
             )
-        logger.info(f"Found user: {user.id} - {user.username}")
         
-        # Query camera
-        logger.info(f"Querying camera with ID: {camera_id} for user: {user.id}")
-        result = await db.execute(
-            select(Camera).where(Camera.id == camera_id, Camera.owner_id == user.id)
-        )
-        camera = result.scalar_one_or_none()
-        
-        if not camera:
-            logger.error(f"Camera {camera_id} not found for user {user.id}")
-            raise HTTPException(
-                status_code=status.HTTP_404_NOT_FOUND,
-                detail="Camera not found"
-            )
-        
-        logger.info(f"Found camera: {camera.name} with URL: {camera.url}")
-        
-        # Check if HLS output directory exists
-        hls_dir = Path(settings.HLS_OUTPUT_DIR) / str(camera_id)
-        hls_dir.mkdir(parents=True, exist_ok=True)
-        logger.info(f"HLS directory created/verified: {hls_dir}")
+        camera = await get_owned_camera(db, camera_id, user.id)
         
         # Optional: AI model resolution via active analytics job can be added here if needed
         
-        # Start stream processing
-        logger.info(f"Calling mock_stream_processor.start_stream with camera_id={camera_id}, url={camera.url}")
+        # Start stream processing; this only schedules the producer/publisher
+        # tasks (which create the camera's HLS directory) and returns at once
         success = await mock_stream_processor.start_stream(str(camera_id), camera.url)
-        logger.info(f"Stream processor result: {success}")
         
         if not success:
-            logger.error(f"Failed to start stream processing for camera {camera_id}")
+            logger.error("Failed to start stream processing for camera %s", camera_id)
             raise HTTPException(
                 status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
                 detail="Failed to start stream processing"
             )
         
-        logger.info(f"Stream processing started successfully for camera {camera_id}")
+        logger.info("Stream processing started for camera %s (%s)", camera_id, camera.url)
+        _stream_status_cache.pop(camera_id, None)
         
         return {
             "message": "Stream processing started",
@@ -261,8 +202,7 @@ async def start_camera_stream(
         }
         
     except Exception as e:
-        logger.error(f"ERROR in start_camera_stream: {type(e).__name__}: {str(e)}", exc_info=True)
-        logger.error(f"Full traceback:", exc_info=True)
+        logger.error("Error in start_camera_stream: %s: %s", type(e).__name__, e, exc_info=True)
         # Return detailed error response
         return {
             "error": f"Internal server error: {type(e).__name__}: {str(e)}",
@@ -273,25 +213,12 @@ async def start_camera_stream(
 @router.post("/{camera_id}/stop_stream")
 async def stop_camera_stream(
     camera_id: UUID,
-    current_user: dict = Depends(get_current_active_user),
+    user_id: UUID = Depends(get_current_user_id),
     db: AsyncSession = Depends(get_db)
 ):
     """Stop video stream processing for a camera"""
-    # Get current user ID
-    result = await db.execute(select(User).where(User.username == current_user["username"]))
-    user = result.scalar_one()
-    
-    # Query camera
-    result = await db.execute(
-        select(Camera).where(Camera.id == camera_id, Camera.owner_id == user.id)
-    )
-    camera = result.scalar_one_or_none()
-    
-    if not camera:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail="Camera not found"
-        )
+    camera = await get_owned_camera(db, camera_id, user_id)
+    _stream_status_cache.pop(camera_id, None)
     
     # TODO: Implement stream processor cleanup
     # This would require tracking active processors globally
@@ -304,34 +231,25 @@ async def stop_camera_stream(
 @router.get("/{camera_id}/stream_status")
 async def get_camera_stream_status(
     camera_id: UUID,
-    current_user: dict = Depends(get_current_active_user),
+    user_id: UUID = Depends(get_current_user_id),
     db: AsyncSession = Depends(get_db)
 ):
     """Get current stream status for a camera"""
-    # Get current user ID
-    result = await db.execute(select(User).where(User.username == current_user["username"]))
-    user = result.scalar_one()
+    cached = _stream_status_cache.get(camera_id)
+    if cached is not None and cached[0] == user_id:
+        return cached[1]
     
-    # Query camera
-    result = await db.execute(
-        select(Camera).where(Camera.id == camera_id, Camera.owner_id == user.id)
-    )
-    camera = result.scalar_one_or_none()
-    
-    if not camera:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail="Camera not found"
-        )
+    camera = await get_owned_camera(db, camera_id, user_id)
     
     # Check if HLS playlist exists
-    hls_playlist = Path(settings.HLS_OUTPUT_DIR) / str(camera_id) / "index.m3u8"
-    stream_active = hls_playlist.exists()
+    stream_active = os.path.isfile(f"{settings.HLS_OUTPUT_DIR}/{camera_id}/index.m3u8")
     
-    return {
+    stream_status = {
         "camera_id": camera_id,
         "stream_active": stream_active,
         "stream_url": f"/api/streams/{camera_id}/index.m3u8" if stream_active else None,
         "camera_active": camera.is_active,
         "last_updated": camera.updated_at.isoformat() if camera.updated_at else None
     }
+    _stream_status_cache[camera_id] = (user_id, stream_status)
+    return stream_status
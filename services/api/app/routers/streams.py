@@ -1,19 +1,44 @@
 from fastapi import APIRouter, Depends, HTTPException, status, UploadFile, File
-from fastapi.responses import FileResponse
+from fastapi.responses import FileResponse, Response
 from pathlib import Path
+from uuid import UUID
+import asyncio
 import os
+import re
+import shutil
 from app.core.dependencies import get_current_user_or_machine
 from app.core.config import settings
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlmodel import select
 from app.db.session import get_db
-from app.models.models import User, Camera, AIModel, AnalyticsJob
+from app.db.lookups import active_model_id
+from app.models.models import User, Camera, AnalyticsJob, uuid7
 from app.services.mock_stream_processor import mock_stream_processor
-from uuid import uuid4
-from datetime import datetime
 
 router = APIRouter()
 
+# Resolved once at import; segment paths are plain string joins onto it
+HLS_BASE = os.fspath(Path(settings.HLS_OUTPUT_DIR).resolve())
+
+# Flat file names only: no separators, no leading dot (so no "." or "..")
+_SEGMENT_NAME_RE = re.compile(r"[A-Za-z0-9_-][A-Za-z0-9_.-]*")
+
+_CONTENT_TYPES = {
+    ".m3u8": "application/vnd.apple.mpegurl",
+    ".ts": "video/mp2t",
+}
+
+_HLS_HEADERS = {
+    "Cache-Control": "no-cache, no-store, must-revalidate",
+    "Pragma": "no-cache",
+    "Expires": "0",
+    "Access-Control-Allow-Origin": "*"
+}
+
+def _save_upload(source, destination: Path) -> None:
+    with open(destination, "wb") as f:
+        shutil.copyfileobj(source, f, length=1024 * 1024)
+
 @router.get("/{camera_id}/{filename:path}")
 async def get_stream_segment(
     camera_id: str,
@@ -24,44 +49,44 @@ async def get_stream_segment(
     Securely serve HLS stream segments with authentication.
     Supports both user JWT tokens and machine API keys.
     """
-    # Construct the file path securely
-    base_path = Path(settings.HLS_OUTPUT_DIR)
-    camera_path = base_path / camera_id
-    file_path = camera_path / filename
-    
-    # Security check: ensure the path is within the allowed directory
+    # Security check: a canonical UUID directory and a flat file name cannot
+    # leave the HLS directory, so no filesystem resolve() is needed
     try:
-        file_path.resolve().relative_to(base_path.resolve())
+        camera_id = str(UUID(camera_id))
     except ValueError:
+        camera_id = None
+    if camera_id is None or not _SEGMENT_NAME_RE.fullmatch(filename):
         raise HTTPException(
             status_code=status.HTTP_403_FORBIDDEN,
             detail="Access denied: invalid path"
         )
+    file_path = f"{HLS_BASE}/{camera_id}/{filename}"
+    
+    # Determine content type based on file extension
+    content_type = _CONTENT_TYPES.get(os.path.splitext(filename)[1], "application/octet-stream")
+    
+    # Hand the transfer to the reverse proxy; it answers 404 for missing files
+    if settings.HLS_ACCEL_REDIRECT_PREFIX:
+        return Response(
+            media_type=content_type,
+            headers={
+                **_HLS_HEADERS,
+                "X-Accel-Redirect": f"{settings.HLS_ACCEL_REDIRECT_PREFIX}/{camera_id}/{filename}"
+            }
+        )
     
     # Check if file exists
-    if not file_path.exists():
+    if not os.path.isfile(file_path):
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail=f"Stream segment not found: {filename}"
         )
     
-    # Determine content type based on file extension
-    content_type = "application/octet-stream"
-    if filename.endswith('.m3u8'):
-        content_type = "application/vnd.apple.mpegurl"
-    elif filename.endswith('.ts'):
-        content_type = "video/mp2t"
-    
     # Serve the file with appropriate headers for HLS streaming
     return FileResponse(
-        path=str(file_path),
+        path=file_path,
         media_type=content_type,
-        headers={
-            "Cache-Control": "no-cache, no-store, must-revalidate",
-            "Pragma": "no-cache",
-            "Expires": "0",
-            "Access-Control-Allow-Origin": "*"
-        }
+        headers=_HLS_HEADERS
     )
 
 @router.get("/{camera_id}/")
@@ -95,22 +120,27 @@ async def upload_video_stream(
             raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="User not found")
 
     # Generate camera id and target dir
-    camera_id = str(uuid4())
-    camera_dir = Path(settings.HLS_OUTPUT_DIR) / camera_id
+    camera_id = uuid7()
+    camera_dir = Path(settings.HLS_OUTPUT_DIR) / str(camera_id)
     camera_dir.mkdir(parents=True, exist_ok=True)
 
-    # Save uploaded file to camera directory
+    # Save uploaded file to camera directory; copied in 1 MiB chunks on a worker
+    # thread so neither the whole video nor the disk writes land on the event loop.
+    # The active AI model is looked up while the copy runs.
     video_path = camera_dir / "source.mp4"
-    try:
-        contents = await file.read()
-        with open(video_path, "wb") as f:
-            f.write(contents)
-    except Exception as e:
-        raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail=f"Failed to save file: {e}")
+    saved, ai_model_id = await asyncio.gather(
+        asyncio.to_thread(_save_upload, file.file, video_path),
+        active_model_id(db),
+        return_exceptions=True
+    )
+    if isinstance(saved, Exception):
+        raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail=f"Failed to save file: {saved}")
+    if isinstance(ai_model_id, Exception):
+        raise ai_model_id
 
     # Create camera record (type=file, status=online)
     camera = Camera(
-        id=uuid4(),
+        id=camera_id,
         name=file.filename or "Uploaded Video",
         type="file",
         url=str(video_path),
@@ -118,17 +148,12 @@ async def upload_video_stream(
         location="Local Uploads",
         status="online",
         is_active=True,
-        owner_id=user.id,
-        created_at=datetime.utcnow()
+        owner_id=user.id
     )
     db.add(camera)
-    await db.commit()
-    await db.refresh(camera)
 
     # Attach active AI model if available and create analytics job
-    result = await db.execute(select(AIModel).where(AIModel.is_active == True))
-    ai_model = result.scalars().first()
-    if ai_model:
+    if ai_model_id:
         job = AnalyticsJob(
             name=f"Upload-{camera.name}",
             description="Auto job for uploaded video",
@@ -137,12 +162,13 @@ async def upload_video_stream(
             nms_threshold=0.4,
             max_detections=100,
             camera_id=camera.id,
-            ai_model_id=ai_model.id,
-            created_by_id=user.id,
-            created_at=datetime.utcnow()
+            ai_model_id=ai_model_id,
+            created_by_id=user.id
         )
         db.add(job)
-        await db.commit()
+
+    # Camera and job are inserted in one transaction
+    await db.commit()
 
     # Start mock stream processor for this camera id using saved video path
     await mock_stream_processor.start_stream(str(camera.id), str(video_path))
@@ -1,9 +1,11 @@
 from fastapi import APIRouter, WebSocket, WebSocketDisconnect, Query, status
 from fastapi.responses import JSONResponse
-import json
+import orjson
 import asyncio
 import logging
+from datetime import datetime
 from typing import Dict, Set
+from app.core.config import settings
 from app.core.security import verify_token
 from app.core.dependencies import get_current_user_or_machine
 from app.services.websocket_manager import connection_manager
@@ -13,25 +15,41 @@ import socketio
 router = APIRouter()
 logger = logging.getLogger(__name__)
 
+class _OrjsonCodec:
+    """json-module stand-in for Socket.IO packet encoding (ignores stdlib kwargs such as separators)"""
+    
+    @staticmethod
+    def dumps(obj, *args, **kwargs) -> str:
+        return orjson.dumps(obj).decode()
+        
+    @staticmethod
+    def loads(data, *args, **kwargs):
+        return orjson.loads(data)
+
+def camera_room(camera_id: str) -> str:
+    return f"camera:{camera_id}"
+
 # Create Socket.IO server
 sio = socketio.AsyncServer(
     async_mode='asgi',
     cors_allowed_origins="*",
-    logger=True,
-    engineio_logger=True
+    json=_OrjsonCodec,
+    # Per-packet Socket.IO/Engine.IO logging only in debug runs
+    logger=settings.DEBUG,
+    engineio_logger=settings.DEBUG
 )
 
 # Socket.IO event handlers
 @sio.event
 async def connect(sid, environ):
     """Handle Socket.IO connection"""
-    logger.info(f"Socket.IO client connected: {sid}")
-    await sio.emit('connected', {'sid': sid})
+    logger.info("Socket.IO client connected: %s", sid)
+    await sio.emit('connected', {'sid': sid}, room=sid)
 
 @sio.event
 async def disconnect(sid):
     """Handle Socket.IO disconnection"""
-    logger.info(f"Socket.IO client disconnected: {sid}")
+    logger.info("Socket.IO client disconnected: %s", sid)
 
 @sio.event
 async def authenticate(sid, data):
@@ -51,13 +69,15 @@ async def authenticate(sid, data):
         await sio.emit('auth_error', {'error': 'Invalid token payload'}, room=sid)
         return False
         
-    # Store user info in session
+    # Store the resolved principal in the session; later events read it from
+    # here instead of re-verifying the token or looking the user up
     async with sio.session(sid) as session:
         session['username'] = username
+        session['user_id'] = payload.get("uid")
         session['authenticated'] = True
         
     await sio.emit('auth_success', {'username': username}, room=sid)
-    logger.info(f"Socket.IO client authenticated: {username}")
+    logger.info("Socket.IO client authenticated: %s", username)
     return True
 
 @sio.event
@@ -68,18 +88,16 @@ async def subscribe_camera(sid, data):
         await sio.emit('error', {'error': 'Camera ID required'}, room=sid)
         return
         
-    async with sio.session(sid) as session:
-        if not session.get('authenticated'):
-            await sio.emit('error', {'error': 'Not authenticated'}, room=sid)
-            return
-            
-        # Add camera to user's subscriptions
-        if 'cameras' not in session:
-            session['cameras'] = set()
-        session['cameras'].add(camera_id)
+    session = await sio.get_session(sid)
+    if not session.get('authenticated'):
+        await sio.emit('error', {'error': 'Not authenticated'}, room=sid)
+        return
         
+    # Subscriptions are Socket.IO rooms, so camera events are encoded once per room
+    await sio.enter_room(sid, camera_room(camera_id))
+    
     await sio.emit('subscribed', {'camera_id': camera_id}, room=sid)
-    logger.info(f"Client {sid} subscribed to camera {camera_id}")
+    logger.debug("Client %s subscribed to camera %s", sid, camera_id)
 
 @sio.event
 async def unsubscribe_camera(sid, data):
@@ -89,12 +107,10 @@ async def unsubscribe_camera(sid, data):
         await sio.emit('error', {'error': 'Camera ID required'}, room=sid)
         return
         
-    async with sio.session(sid) as session:
-        if 'cameras' in session:
-            session['cameras'].discard(camera_id)
-            
+    await sio.leave_room(sid, camera_room(camera_id))
+    
     await sio.emit('unsubscribed', {'camera_id': camera_id}, room=sid)
-    logger.info(f"Client {sid} unsubscribed from camera {camera_id}")
+    logger.debug("Client %s unsubscribed from camera %s", sid, camera_id)
 
 @sio.event
 async def get_detection_stats(sid, data):
@@ -132,11 +148,12 @@ async def get_object_counts(sid, data):
             
     if camera_id:
         counts = detection_simulator.get_current_counts(camera_id)
+        now_iso = datetime.utcnow().isoformat()
         object_counts = [
             {
                 "object_class": obj_class,
                 "count": count,
-                "last_updated": datetime.utcnow().isoformat()
+                "last_updated": now_iso
             }
             for obj_class, count in counts.items()
         ]
@@ -175,40 +192,44 @@ async def websocket_endpoint(
             data = await websocket.receive_text()
             
             try:
-                message = json.loads(data)
+                message = orjson.loads(data)
                 
                 # Handle different message types
                 if message.get("type") == "subscribe_camera":
                     camera_id = message.get("camera_id")
                     if camera_id:
                         await connection_manager.subscribe_to_camera(websocket, camera_id)
-                        logger.info(f"User {username} subscribed to camera {camera_id}")
+                        logger.debug("User %s subscribed to camera %s", username, camera_id)
                         
                 elif message.get("type") == "unsubscribe_camera":
                     camera_id = message.get("camera_id")
                     if camera_id:
                         connection_manager.unsubscribe_from_camera(websocket, camera_id)
-                        logger.info(f"User {username} unsubscribed from camera {camera_id}")
+                        logger.debug("User %s unsubscribed from camera %s", username, camera_id)
                         
                 elif message.get("type") == "ping":
                     await connection_manager.send_personal_message(
-                        json.dumps({"type": "pong", "timestamp": asyncio.get_event_loop().time()}),
+                        {"type": "pong", "timestamp": asyncio.get_running_loop().time()},
                         websocket
                     )
                     
                 else:
-                    logger.info(f"Received message from {username}: {message}")
+                    logger.debug("Received message from %s: %s", username, message)
                     
-            except json.JSONDecodeError:
-                logger.error(f"Invalid JSON received from {username}: {data}")
+            except orjson.JSONDecodeError:
+                logger.error("Invalid JSON received from %s: %s", username, data)
                 
     except WebSocketDisconnect:
         connection_manager.disconnect(websocket, username)
-        logger.info(f"WebSocket disconnected for user: {username}")
+        logger.info("WebSocket disconnected for user: %s", username)
     except Exception as e:
-        logger.error(f"WebSocket error for user {username}: {e}")
+        logger.error("WebSocket error for user %s: %s", username, e)
         connection_manager.disconnect(websocket, username)
 
+async def emit_to_camera(event: str, data, camera_id: str):
+    """Emit an event once to every Socket.IO client subscribed to a camera"""
+    await sio.emit(event, data, room=camera_room(camera_id))
+
 @router.get("/health")
 async def websocket_health():
     """Health check for WebSocket service"""
@@ -221,4 +242,5 @@ async def websocket_health():
     }
 
 # Integration with detection simulator
-detection_simulator.set_websocket_manager(connection_manager)
\ No newline at end of file
+detection_simulator.set_websocket_manager(connection_manager)
+detection_simulator.set_camera_emitter(emit_to_camera)
\ No newline at end of file
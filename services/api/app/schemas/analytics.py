@@ -1,22 +1,23 @@
-from pydantic import BaseModel, Field
+from pydantic import BaseModel, ConfigDict, Field
 from typing import Optional, List, Dict, Any
 from datetime import datetime
+from uuid import UUID
 
 class AnalyticsJobCreate(BaseModel):
     name: str
     description: Optional[str] = None
-    camera_id: int
-    model_id: int
+    camera_id: UUID
+    model_id: UUID
     confidence_threshold: float = Field(default=0.5, ge=0.0, le=1.0)
     nms_threshold: float = Field(default=0.4, ge=0.0, le=1.0)
     max_detections: int = Field(default=100, ge=1, le=1000)
 
 class AnalyticsJobResponse(BaseModel):
-    id: int
+    id: UUID
     name: str
     description: Optional[str] = None
-    camera_id: int
-    model_id: int
+    camera_id: UUID
+    model_id: UUID
     confidence_threshold: float
     nms_threshold: float
     max_detections: int
@@ -24,24 +25,23 @@ class AnalyticsJobResponse(BaseModel):
     created_at: datetime
     updated_at: Optional[datetime] = None
     
-    class Config:
-        from_attributes = True
+    model_config = ConfigDict(from_attributes=True)
 
 class ROICreate(BaseModel):
     name: str
     polygon_points: List[Dict[str, float]]
     roi_type: str = Field(default="zone")
-    analytics_job_id: int
+    analytics_job_id: UUID
     description: Optional[str] = None
     alert_on_entry: bool = Field(default=True)
     alert_on_exit: bool = Field(default=False)
 
 class ROIResponse(BaseModel):
-    id: int
+    id: UUID
     name: str
     polygon_points: List[Dict[str, float]]
     roi_type: str
-    analytics_job_id: int
+    analytics_job_id: UUID
     description: Optional[str] = None
     alert_on_entry: bool
     alert_on_exit: bool
@@ -49,5 +49,4 @@ class ROIResponse(BaseModel):
     created_at: datetime
     updated_at: Optional[datetime] = None
     
-    class Config:
-        from_attributes = True
\ No newline at end of file
+    model_config = ConfigDict(from_attributes=True)
\ No newline at end of file
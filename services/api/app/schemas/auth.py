@@ -1,6 +1,7 @@
-from pydantic import BaseModel, EmailStr
+from pydantic import BaseModel, ConfigDict, EmailStr, computed_field
 from typing import Optional
 from datetime import datetime
+from uuid import UUID
 
 class Token(BaseModel):
     access_token: str
@@ -13,13 +14,17 @@ class UserCreate(BaseModel):
     full_name: Optional[str] = None
 
 class UserResponse(BaseModel):
-    id: int
+    id: UUID
     username: str
     email: str
     full_name: Optional[str] = None
     is_active: bool
-    is_superuser: bool
+    role: str
     created_at: datetime
     
-    class Config:
-        from_attributes = True
\ No newline at end of file
+    model_config = ConfigDict(from_attributes=True)
+    
+    @computed_field
+    @property
+    def is_superuser(self) -> bool:
+        return self.role == "admin"
@@ -0,0 +1,22 @@
+import msgspec
+from typing import Optional, Dict, Any
+
+class BBox(msgspec.Struct):
+    x: float = 0.0
+    y: float = 0.0
+    width: float = 0.0
+    height: float = 0.0
+
+class MetadataMessage(msgspec.Struct):
+    """Raw detection metadata published by the processor on aries-metadata-raw"""
+    camera_id: Optional[str] = None
+    analytics_job_id: Optional[str] = None
+    alert_type: str = "object_detected"
+    confidence: float = 0.0
+    object_class: str = "unknown"
+    object_id: Optional[str] = None
+    bbox: BBox = msgspec.field(default_factory=BBox)
+    snapshot_path: Optional[str] = None
+    metadata: Dict[str, Any] = msgspec.field(default_factory=dict)
+
+metadata_decoder = msgspec.json.Decoder(MetadataMessage)
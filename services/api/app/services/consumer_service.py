@@ -1,127 +1,284 @@
 import asyncio
-import json
+import concurrent.futures
 import logging
-from typing import Dict, Any
+import msgspec
+import orjson
+from typing import Dict, Any, List, Optional, Set, Tuple
 from datetime import datetime
+from uuid import UUID
+from cachetools import TTLCache
+from sqlalchemy import insert
+from sqlalchemy.exc import DataError, IntegrityError
 from sqlalchemy.ext.asyncio import AsyncSession
 from app.db.session import AsyncSessionLocal
-from app.models.models import AlertEvent, Camera, AnalyticsJob
+from app.models.models import AlertEvent, Camera, AnalyticsJob, uuid7
 from app.core.config import settings
-from pulsar import Client, ConsumerType, InitialPosition
+from app.schemas.metadata import MetadataMessage, metadata_decoder
+from pulsar import Client, ConsumerType, InitialPosition, Result
 from sqlmodel import select
 
 logger = logging.getLogger(__name__)
 
+# Most messages stored per INSERT
+_BATCH_SIZE = 100
+# Received messages buffered ahead of the consume loop
+_QUEUE_SIZE = 1000
+# Column limits checked before the INSERT, so one oversized value cannot fail a whole batch
+_ALERT_TYPE_LENGTH = AlertEvent.__table__.c.alert_type.type.length
+_OBJECT_CLASS_LENGTH = AlertEvent.__table__.c.object_class.type.length
+# Longest a received message waits for queue space before it is handed back to the broker
+_ENQUEUE_TIMEOUT = 5.0
+
+def _on_alert_sent(result, message_id):
+    """Delivery callback for critical alerts, run on the Pulsar client thread"""
+    if result != Result.Ok:
+        logger.error("Error publishing critical alert: %s", result)
+    else:
+        logger.debug("Critical alert published: %s", message_id)
+
 class MetadataConsumer:
     def __init__(self):
         self.client = None
         self.consumer = None
+        self.producer = None
         self.is_running = False
+        # Known camera/job ids; only hits are cached so new rows are picked up
+        self._camera_cache: TTLCache = TTLCache(maxsize=10_000, ttl=60)
+        self._job_cache: TTLCache = TTLCache(maxsize=10_000, ttl=60)
+        # Filled by the Pulsar listener thread, drained by consume_metadata
+        self._messages: Optional[asyncio.Queue] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        # Listener hand-offs waiting for queue space; referenced so they are not collected
+        self._enqueue_tasks: Set[asyncio.Task] = set()
+    
+    def _on_message(self, consumer, msg):
+        """Pulsar message listener; blocks the listener thread while the queue is full, up to a bound.
+        
+        Until the event loop claims the message, the listener may withdraw it;
+        after that the loop alone decides whether it is queued or nacked.
+        """
+        claimed = concurrent.futures.Future()
+        try:
+            self._loop.call_soon_threadsafe(self._enqueue, consumer, msg, claimed)
+        except RuntimeError:
+            # Event loop already closed
+            consumer.negative_acknowledge(msg)
+            return
+        try:
+            claimed.result(timeout=_ENQUEUE_TIMEOUT + 1)
+        except concurrent.futures.TimeoutError:
+            # The loop is not running callbacks (shutdown): withdraw the message
+            # unless the loop claimed it in the meantime
+            if claimed.cancel():
+                consumer.negative_acknowledge(msg)
+    
+    def _enqueue(self, consumer, msg, claimed: concurrent.futures.Future):
+        """Event loop side of _on_message: queue msg, waiting for space only when the queue is full"""
+        if not claimed.set_running_or_notify_cancel():
+            return  # Withdrawn and nacked by the listener
+        try:
+            self._messages.put_nowait(msg)
+            claimed.set_result(True)
+        except asyncio.QueueFull:
+            task = asyncio.create_task(self._enqueue_when_space(consumer, msg, claimed))
+            self._enqueue_tasks.add(task)
+            task.add_done_callback(self._enqueue_tasks.discard)
+    
+    async def _enqueue_when_space(self, consumer, msg, claimed: concurrent.futures.Future):
+        queued = False
+        try:
+            async with asyncio.timeout(_ENQUEUE_TIMEOUT):
+                await self._messages.put(msg)
+            queued = True
+        except TimeoutError:
+            pass
+        finally:
+            # Cancelled or timed out before the put went through: hand it back to the broker
+            if not queued:
+                consumer.negative_acknowledge(msg)
+            claimed.set_result(queued)
+    
+    def _open_client(self):
+        self.client = Client(settings.PULSAR_URL)
+        self.consumer = self.client.subscribe(
+            topic='aries-metadata-raw',
+            subscription_name='api-consumer',
+            consumer_type=ConsumerType.Shared,
+            initial_position=InitialPosition.Earliest,
+            message_listener=self._on_message
+            )
+        # One long-lived, batching producer for critical alerts
+        self.producer = self.client.create_producer(
+            'aries-alerts-critical',
+            block_if_queue_full=True,
+            batching_enabled=True,
+            batching_max_messages=100,
+            batching_max_publish_delay_ms=10
+        )
     
     async def connect(self):
         """Connect to Pulsar broker"""
         try:
-            self.client = Client(settings.PULSAR_URL)
-            self.consumer = self.client.subscribe(
-                topic='aries-metadata-raw',
-                subscription_name='api-consumer',
-                consumer_type=ConsumerType.Shared,
-                initial_position=InitialPosition.Earliest
-                )
+            self._loop = asyncio.get_running_loop()
+            self._messages = asyncio.Queue(maxsize=_QUEUE_SIZE)
+            # Subscribing and creating the producer wait on the broker; keep them off the event loop
+            await asyncio.to_thread(self._open_client)
             logger.info("Connected to Pulsar broker for metadata consumption")
             return True
         except Exception as e:
             logger.error(f"Failed to connect to Pulsar broker: {e}")
             return False
     
-    async def process_message(self, message: Dict[str, Any]):
-        """Process incoming metadata message"""
-        try:
-            # Parse the message
-            camera_id = message.get('camera_id')
-            analytics_job_id = message.get('analytics_job_id')
-            alert_type = message.get('alert_type', 'object_detected')
+    async def _existing_ids(self, session: AsyncSession, model, cache: TTLCache, ids: Set[UUID]) -> Set[UUID]:
+        """Subset of ids present in the model's table; cache misses are resolved with one IN query"""
+        unknown = {row_id for row_id in ids if row_id not in cache}
+        found = ids - unknown
+        if unknown:
+            result = await session.execute(select(model.id).where(model.id.in_(unknown)))
+            for row_id in result.scalars():
+                cache[row_id] = True
+                found.add(row_id)
+        return found
+    
+    async def process_batch(self, messages: List[MetadataMessage]):
+        """Store a batch of metadata messages as alert events with a single INSERT"""
+        rows = []
+        for message in messages:
+            if not message.camera_id or not message.analytics_job_id:
+                logger.warning("Invalid message format: %s", message)
+                continue
+            try:
+                camera_id = UUID(message.camera_id)
+                analytics_job_id = UUID(message.analytics_job_id)
+            except ValueError:
+                logger.warning("Invalid ids in message: %s", message)
+                continue
+            if len(message.alert_type) > _ALERT_TYPE_LENGTH or len(message.object_class) > _OBJECT_CLASS_LENGTH:
+                logger.warning("Alert type or object class too long in message: %s", message)
+                continue
+            rows.append({
+                "id": uuid7(),
+                "camera_id": camera_id,
+                "analytics_job_id": analytics_job_id,
+                "alert_type": message.alert_type,
+                "confidence": message.confidence,
+                "object_class": message.object_class,
+                "object_id": message.object_id,
+                "bbox_x": message.bbox.x,
+                "bbox_y": message.bbox.y,
+                "bbox_width": message.bbox.width,
+                "bbox_height": message.bbox.height,
+                "snapshot_path": message.snapshot_path,
+                "event_metadata": message.metadata,
+                "processed": False
+            })
+        if not rows:
+            return
+        
+        async with AsyncSessionLocal() as session:
+            cameras = await self._existing_ids(session, Camera, self._camera_cache, {row["camera_id"] for row in rows})
+            jobs = await self._existing_ids(session, AnalyticsJob, self._job_cache, {row["analytics_job_id"] for row in rows})
             
-            if not camera_id or not analytics_job_id:
-                logger.warning(f"Invalid message format: {message}")
+            valid_rows = []
+            for row in rows:
+                if row["camera_id"] in cameras and row["analytics_job_id"] in jobs:
+                    valid_rows.append(row)
+                else:
+                    logger.warning(
+                        "Camera or job not found: camera_id=%s, job_id=%s",
+                        row["camera_id"], row["analytics_job_id"]
+                    )
+            if not valid_rows:
                 return
             
-            # Create alert event in database
-            async with AsyncSessionLocal() as session:
-                # Get camera and analytics job
-                camera_result = await session.execute(
-                    select(Camera).where(Camera.id == camera_id)
-                )
-                camera = camera_result.scalar_one_or_none()
-                
-                job_result = await session.execute(
-                    select(AnalyticsJob).where(AnalyticsJob.id == analytics_job_id)
-                )
-                job = job_result.scalar_one_or_none()
-                
-                if not camera or not job:
-                    logger.warning(f"Camera or job not found: camera_id={camera_id}, job_id={analytics_job_id}")
-                    return
-                
-                # Create alert event
-                alert_event = AlertEvent(
-                    camera_id=camera_id,
-                    analytics_job_id=analytics_job_id,
-                    alert_type=alert_type,
-                    confidence=message.get('confidence', 0.0),
-                    object_class=message.get('object_class', 'unknown'),
-                    object_id=message.get('object_id'),
-                    bbox_x=message.get('bbox', {}).get('x', 0.0),
-                    bbox_y=message.get('bbox', {}).get('y', 0.0),
-                    bbox_width=message.get('bbox', {}).get('width', 0.0),
-                    bbox_height=message.get('bbox', {}).get('height', 0.0),
-                    snapshot_path=message.get('snapshot_path'),
-                    event_metadata=json.dumps(message.get('metadata', {}))
+            valid_rows, timestamps = await self._insert_alert_events(session, valid_rows)
+        
+        logger.info("Stored %d alert events", len(valid_rows))
+        
+        # Publish to alerts-critical topic for real-time notifications
+        for row, timestamp in zip(valid_rows, timestamps):
+            await self.publish_critical_alert(row, timestamp)
+    
+    async def _insert_alert_events(self, session: AsyncSession, rows: List[Dict[str, Any]]) -> Tuple[List[Dict[str, Any]], List[datetime]]:
+        """Insert rows and return the stored ones with their server timestamps.
+        
+        One bulk INSERT normally; if a row violates a constraint, the rows are
+        retried one by one and those that still fail are logged and dropped.
+        """
+        try:
+            # RETURNING only the server timestamps, the rest is already in the rows
+            result = await session.execute(
+                insert(AlertEvent).returning(AlertEvent.timestamp, sort_by_parameter_order=True),
+                rows
+            )
+            timestamps = result.scalars().all()
+            await session.commit()
+            return rows, timestamps
+        except (IntegrityError, DataError) as e:
+            await session.rollback()
+            logger.warning("Bulk insert of %d alert events failed, retrying row by row: %s", len(rows), e)
+        
+        stored, timestamps = [], []
+        for row in rows:
+            try:
+                result = await session.execute(
+                    insert(AlertEvent).values(**row).returning(AlertEvent.timestamp)
                 )
-                
-                session.add(alert_event)
+                timestamp = result.scalar_one()
                 await session.commit()
-                
-                logger.info(f"Alert event created: {alert_event.id} for camera {camera_id}")
-                
-                # Publish to alerts-critical topic for real-time notifications
-                await self.publish_critical_alert(alert_event)
-                
-        except Exception as e:
-            logger.error(f"Error processing message: {e}")
+            except (IntegrityError, DataError) as e:
+                await session.rollback()
+                logger.error(
+                    "Dropping alert event: camera_id=%s, job_id=%s: %s",
+                    row["camera_id"], row["analytics_job_id"], e
+                )
+                # The camera or job may have been deleted since it was cached
+                self._camera_cache.pop(row["camera_id"], None)
+                self._job_cache.pop(row["analytics_job_id"], None)
+                continue
+            stored.append(row)
+            timestamps.append(timestamp)
+        return stored, timestamps
     
-    async def publish_critical_alert(self, alert_event: AlertEvent):
-        """Publish critical alerts to the alerts-critical topic"""
+    async def publish_critical_alert(self, alert: Dict[str, Any], timestamp: datetime):
+        """Publish critical alerts to the alerts-critical topic from the inserted row values"""
         try:
-            producer = self.client.create_producer('aries-alerts-critical')
-            
             alert_data = {
-                'id': alert_event.id,
-                'timestamp': alert_event.timestamp.isoformat(),
-                'camera_id': alert_event.camera_id,
-                'analytics_job_id': alert_event.analytics_job_id,
-                'alert_type': alert_event.alert_type,
-                'confidence': alert_event.confidence,
-                'object_class': alert_event.object_class,
-                'object_id': alert_event.object_id,
+                'id': alert['id'],
+                'timestamp': timestamp,
+                'camera_id': alert['camera_id'],
+                'analytics_job_id': alert['analytics_job_id'],
+                'alert_type': alert['alert_type'],
+                'confidence': alert['confidence'],
+                'object_class': alert['object_class'],
+                'object_id': alert['object_id'],
                 'bbox': {
-                    'x': alert_event.bbox_x,
-                    'y': alert_event.bbox_y,
-                    'width': alert_event.bbox_width,
-                    'height': alert_event.bbox_height
+                    'x': alert['bbox_x'],
+                    'y': alert['bbox_y'],
+                    'width': alert['bbox_width'],
+                    'height': alert['bbox_height']
                 },
-                'snapshot_path': alert_event.snapshot_path,
-                'metadata': alert_event.metadata
+                'snapshot_path': alert['snapshot_path'],
+                'metadata': alert['event_metadata']
             }
             
-            producer.send(json.dumps(alert_data).encode('utf-8'))
-            producer.close()
-            
-            logger.info(f"Critical alert published: {alert_event.id}")
+            # orjson writes UUIDs and datetimes natively and returns bytes ready to send
+            payload = orjson.dumps(alert_data, option=orjson.OPT_NAIVE_UTC)
+            self.producer.send_async(payload, callback=_on_alert_sent)
             
         except Exception as e:
             logger.error(f"Error publishing critical alert: {e}")
     
+    async def _receive_batch(self) -> list:
+        """Wait for one message, then take whatever else is already queued"""
+        msgs = [await self._messages.get()]
+        while len(msgs) < _BATCH_SIZE:
+            try:
+                msgs.append(self._messages.get_nowait())
+            except asyncio.QueueEmpty:
+                break
+        return msgs
+    
     async def consume_metadata(self):
         """Main consumer loop for processing metadata messages"""
         logger.info("Starting metadata consumer service...")
@@ -134,31 +291,39 @@ class MetadataConsumer:
                         await asyncio.sleep(5)
                         continue
                 
-                # Receive message with timeout
                 if not self.consumer:
                     await asyncio.sleep(1)
                     continue
 
-                msg = self.consumer.receive(timeout_millis=1000)
+                msgs = await self._receive_batch()
                 
-                if msg:
+                # Parse and validate each message in one pass
+                decoded = []
+                for msg in msgs:
                     try:
-                        # Parse message
-                        message_data = json.loads(msg.data().decode('utf-8'))
-                        logger.debug(f"Received message: {message_data}")
-                        
-                        # Process the message
-                        await self.process_message(message_data)
-                        
-                        # Acknowledge the message
+                        decoded.append((msg, metadata_decoder.decode(msg.data())))
+                    except msgspec.ValidationError as e:
+                        # Wrong field types will never decode; redelivery would loop forever
+                        logger.error("Dropping message that does not match the metadata schema: %s", e)
                         self.consumer.acknowledge(msg)
-                        
-                    except json.JSONDecodeError as e:
-                        logger.error(f"Invalid JSON in message: {e}")
-                        self.consumer.negative_acknowledge(msg)
-                    except Exception as e:
-                        logger.error(f"Error processing message: {e}")
+                    except msgspec.DecodeError as e:
+                        logger.error("Dropping message with invalid JSON: %s", e)
+                        self.consumer.acknowledge(msg)
+                
+                if not decoded:
+                    continue
+                
+                try:
+                    await self.process_batch([message for _, message in decoded])
+                except Exception as e:
+                    logger.error("Error processing batch of %d messages: %s", len(decoded), e)
+                    for msg, _ in decoded:
                         self.consumer.negative_acknowledge(msg)
+                    continue
+                
+                # Shared subscriptions do not allow cumulative acks
+                for msg, _ in decoded:
+                    self.consumer.acknowledge(msg)
                 
             except Exception as e:
                 logger.error(f"Consumer error: {e}")
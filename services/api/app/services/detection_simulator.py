@@ -1,14 +1,43 @@
 import asyncio
 import random
-import json
-from datetime import datetime, timedelta
-from uuid import uuid4
-from typing import Dict, List, Optional
+import time
+from collections import deque
+from datetime import datetime, timedelta, timezone
+from uuid import UUID, uuid4
+from typing import Deque, Dict, List, Optional, Tuple
+from cachetools import TTLCache
+from sqlalchemy import func
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlmodel import select
-from app.models.models import Camera, AnalyticsJob, AlertEvent, AIModel
+from app.models.models import Camera, AnalyticsJob, AlertEvent, AIModel, uuid7
 from app.db.session import AsyncSessionLocal
 
+# How long a detected object stays eligible for re-identification
+TRACKING_SECONDS = 30
+MAX_TRACKED_PER_CLASS = 64
+
+def _spans(*ranges):
+    return tuple((low, high - low) for low, high in ranges)
+
+# (width, height, x, y) sampling ranges per class, as (low, span) for low + span * random()
+_PERSON = _spans(
+    (0.05, 0.15), (0.15, 0.35),  # People are relatively small
+    (0.1, 0.8), (0.3, 0.7)       # and usually appear in the lower part of the frame
+)
+_VEHICLE = _spans(
+    (0.15, 0.4), (0.1, 0.25),    # Vehicles are larger
+    (0.05, 0.7), (0.4, 0.8)      # and on the road area
+)
+_TWO_WHEELER = _spans((0.08, 0.2), (0.1, 0.2), (0.1, 0.8), (0.4, 0.8))
+BBOX_RANGES = {
+    "person": _PERSON,
+    "car": _VEHICLE,
+    "truck": _VEHICLE,
+    "bus": _VEHICLE,
+    "bicycle": _TWO_WHEELER,
+    "motorcycle": _TWO_WHEELER,
+}
+
 class DetectionSimulator:
     """
     Simulates real-time object detection similar to OpenDataCam
@@ -19,14 +48,25 @@ class DetectionSimulator:
         self.is_running = False
         self.detection_rate = 0.5  # detections per second per camera
         self.object_classes = ["person", "car", "truck", "bus", "bicycle", "motorcycle"]
-        self.active_detections: Dict[str, Dict] = {}  # Track active objects
+        # Recently seen (object_id, time.time()) per (camera_id, class), oldest first
+        self.active_detections: Dict[Tuple[str, str], Deque[Tuple[str, float]]] = {}
         self.object_counters: Dict[str, Dict] = {}  # Object counting per camera
         self.websocket_manager = None
+        # Coroutine (event, data, camera_id) emitting once to a camera's Socket.IO room
+        self.camera_emitter = None
+        # Per-camera stats, recomputed at most once a second; the per-camera
+        # lock makes concurrent misses share one computation
+        self._stats_cache: TTLCache = TTLCache(maxsize=1024, ttl=1)
+        self._stats_locks: Dict[str, asyncio.Lock] = {}
         
     def set_websocket_manager(self, websocket_manager):
         """Set the WebSocket manager for real-time updates"""
         self.websocket_manager = websocket_manager
         
+    def set_camera_emitter(self, camera_emitter):
+        """Set the Socket.IO emitter for per-camera room updates"""
+        self.camera_emitter = camera_emitter
+        
     async def get_active_cameras(self, session: AsyncSession) -> List[Camera]:
         """Get all active cameras with analytics jobs"""
         result = await session.execute(
@@ -35,55 +75,44 @@ class DetectionSimulator:
         )
         return result.scalars().all()
         
-    async def get_analytics_job_for_camera(self, session: AsyncSession, camera_id: str) -> Optional[AnalyticsJob]:
-        """Get active analytics job for camera"""
+    async def get_analytics_jobs_for_cameras(self, session: AsyncSession, cameras: List[Camera]) -> Dict[UUID, AnalyticsJob]:
+        """Get the active analytics job of each camera in one query"""
+        if not cameras:
+            return {}
         result = await session.execute(
             select(AnalyticsJob)
             .where(
-                AnalyticsJob.camera_id == camera_id,
+                AnalyticsJob.camera_id.in_([camera.id for camera in cameras]),
                 AnalyticsJob.is_active == True
             )
         )
-        return result.scalar_one_or_none()
+        return {job.camera_id: job for job in result.scalars()}
         
-    def generate_object_id(self, camera_id: str, object_class: str) -> str:
+    def generate_object_id(self, camera_id: str, object_class: str, now_ts: float) -> str:
         """Generate a unique object ID with tracking simulation"""
         # Simulate object tracking - some objects persist across frames
         if random.random() < 0.3:  # 30% chance of reusing existing object
-            existing_objects = [
-                obj_id for obj_id, obj_data in self.active_detections.items()
-                if obj_data["camera_id"] == camera_id and obj_data["class"] == object_class
-                and (datetime.utcnow() - obj_data["last_seen"]).seconds < 30  # Track for 30 seconds
-            ]
-            if existing_objects:
-                return random.choice(existing_objects)
+            tracked = self.active_detections.get((camera_id, object_class))
+            if tracked:
+                # Track for 30 seconds; expired entries are at the head
+                cutoff = now_ts - TRACKING_SECONDS
+                while tracked and tracked[0][1] < cutoff:
+                    tracked.popleft()
+                if tracked:
+                    return random.choice(tracked)[0]
                 
         return f"{object_class}_{uuid4().hex[:8]}"
         
     def generate_bounding_box(self, camera_id: str, object_class: str) -> Dict:
         """Generate realistic bounding box coordinates"""
         # Different object types have different typical sizes and positions
-        if object_class == "person":
-            width = random.uniform(0.05, 0.15)  # People are relatively small
-            height = random.uniform(0.15, 0.35)
-            x = random.uniform(0.1, 0.8)
-            y = random.uniform(0.3, 0.7)  # People usually appear in lower part of frame
-        elif object_class in ["car", "truck", "bus"]:
-            width = random.uniform(0.15, 0.4)  # Vehicles are larger
-            height = random.uniform(0.1, 0.25)
-            x = random.uniform(0.05, 0.7)
-            y = random.uniform(0.4, 0.8)  # Vehicles on road area
-        else:  # bicycles, motorcycles
-            width = random.uniform(0.08, 0.2)
-            height = random.uniform(0.1, 0.2)
-            x = random.uniform(0.1, 0.8)
-            y = random.uniform(0.4, 0.8)
-            
+        (w0, dw), (h0, dh), (x0, dx), (y0, dy) = BBOX_RANGES.get(object_class, _TWO_WHEELER)
+        rand = random.random
         return {
-            "x": x,
-            "y": y,
-            "width": width,
-            "height": height
+            "x": x0 + dx * rand(),
+            "y": y0 + dy * rand(),
+            "width": w0 + dw * rand(),
+            "height": h0 + dh * rand()
         }
         
     def generate_object_metadata(self, object_class: str) -> Dict:
@@ -101,20 +130,19 @@ class DetectionSimulator:
             
         return metadata
         
-    async def simulate_detection(self, camera: Camera, analytics_job: AnalyticsJob):
-        """Simulate a single detection event"""
+    async def simulate_detection(self, camera: Camera, analytics_job: AnalyticsJob, now_ts: float, timestamp: datetime):
+        """Simulate a single detection event at the cycle's clock reading"""
         object_class = random.choice(self.object_classes)
-        object_id = self.generate_object_id(camera.id, object_class)
+        object_id = self.generate_object_id(camera.id, object_class, now_ts)
         bbox = self.generate_bounding_box(camera.id, object_class)
-        confidence = random.uniform(0.7, 0.99)
+        confidence = 0.7 + 0.29 * random.random()
         metadata = self.generate_object_metadata(object_class)
         
         # Update active detections
-        self.active_detections[object_id] = {
-            "camera_id": camera.id,
-            "class": object_class,
-            "last_seen": datetime.utcnow()
-        }
+        key = (camera.id, object_class)
+        if key not in self.active_detections:
+            self.active_detections[key] = deque(maxlen=MAX_TRACKED_PER_CLASS)
+        self.active_detections[key].append((object_id, now_ts))
         
         # Update object counters
         if camera.id not in self.object_counters:
@@ -123,14 +151,13 @@ class DetectionSimulator:
         if object_class not in self.object_counters[camera.id]:
             self.object_counters[camera.id][object_class] = 0
             
-        # Count new objects (not recently seen)
-        if (datetime.utcnow() - self.active_detections[object_id].get("first_seen", datetime.utcnow())).seconds < 1:
-            self.object_counters[camera.id][object_class] += 1
+        # Count the detection
+        self.object_counters[camera.id][object_class] += 1
             
         # Create alert event
         alert_event = AlertEvent(
-            id=uuid4(),
-            timestamp=datetime.utcnow(),
+            id=uuid7(),
+            timestamp=timestamp,
             alert_type="object_detected",
             confidence=confidence,
             object_class=object_class,
@@ -140,7 +167,7 @@ class DetectionSimulator:
             bbox_width=bbox["width"],
             bbox_height=bbox["height"],
             snapshot_path=f"/snapshots/{camera.id}/{uuid4().hex[:8]}.jpg",
-            event_metadata=json.dumps(metadata),
+            event_metadata=metadata,
             processed=True,
             camera_id=camera.id,
             analytics_job_id=analytics_job.id
@@ -148,127 +175,165 @@ class DetectionSimulator:
         
         return alert_event
         
-    async def save_detection_to_db(self, alert_event: AlertEvent):
-        """Save detection event to database"""
-        async with AsyncSessionLocal() as session:
-            session.add(alert_event)
-            await session.commit()
-            
-    async def broadcast_detection(self, alert_event: AlertEvent):
-        """Broadcast detection via WebSocket"""
+    def detection_payload(self, alert_event: AlertEvent) -> Dict:
+        """WebSocket representation of a detection event"""
+        metadata = alert_event.event_metadata or {}
+        return {
+            "id": str(alert_event.id),
+            "timestamp": alert_event.timestamp.isoformat(),
+            "camera_id": str(alert_event.camera_id),
+            "object_class": alert_event.object_class,
+            "confidence": alert_event.confidence,
+            "bbox": {
+                "x": alert_event.bbox_x,
+                "y": alert_event.bbox_y,
+                "width": alert_event.bbox_width,
+                "height": alert_event.bbox_height
+            },
+            "object_id": alert_event.object_id,
+            "speed": metadata.get("speed"),
+            "direction": metadata.get("direction"),
+            "color": metadata.get("color")
+        }
+        
+    async def broadcast_detections(self, alert_events: List[AlertEvent]):
+        """Broadcast a cycle's detections via WebSocket as one batch"""
+        if not alert_events or not (self.websocket_manager or self.camera_emitter):
+            return
+        detections = [self.detection_payload(alert_event) for alert_event in alert_events]
         if self.websocket_manager:
-            detection_data = {
-                "id": str(alert_event.id),
-                "timestamp": alert_event.timestamp.isoformat(),
-                "camera_id": str(alert_event.camera_id),
-                "object_class": alert_event.object_class,
-                "confidence": alert_event.confidence,
-                "bbox": {
-                    "x": alert_event.bbox_x,
-                    "y": alert_event.bbox_y,
-                    "width": alert_event.bbox_width,
-                    "height": alert_event.bbox_height
-                },
-                "object_id": alert_event.object_id,
-                "speed": json.loads(alert_event.event_metadata or "{}").get("speed"),
-                "direction": json.loads(alert_event.event_metadata or "{}").get("direction"),
-                "color": json.loads(alert_event.event_metadata or "{}").get("color")
-            }
-            
-            await self.websocket_manager.broadcast_detection(detection_data)
+            await self.websocket_manager.broadcast_detections(detections)
+        if self.camera_emitter:
+            # One emit per camera room, each carrying only that camera's detections
+            by_camera: Dict[str, List[Dict]] = {}
+            for detection in detections:
+                by_camera.setdefault(detection["camera_id"], []).append(detection)
+            await asyncio.gather(*(
+                self.camera_emitter("detections", camera_detections, camera_id)
+                for camera_id, camera_detections in by_camera.items()
+            ))
             
     async def broadcast_object_counts(self, camera_id: str):
         """Broadcast current object counts for a camera"""
-        if self.websocket_manager and camera_id in self.object_counters:
+        if (self.websocket_manager or self.camera_emitter) and camera_id in self.object_counters:
             counts = []
+            now_iso = datetime.utcnow().isoformat()
             for object_class, count in self.object_counters[camera_id].items():
                 counts.append({
                     "object_class": object_class,
                     "count": count,
-                    "last_updated": datetime.utcnow().isoformat()
+                    "last_updated": now_iso
                 })
                 
-            await self.websocket_manager.broadcast_object_counts(camera_id, counts)
+            if self.websocket_manager:
+                await self.websocket_manager.broadcast_object_counts(camera_id, counts)
+            if self.camera_emitter:
+                await self.camera_emitter("object_counts", counts, str(camera_id))
             
     async def calculate_detection_stats(self, camera_id: str) -> Dict:
-        """Calculate detection statistics for a camera"""
+        """Calculate detection statistics for a camera (cached for one second)"""
+        key = str(camera_id)
+        stats = self._stats_cache.get(key)
+        if stats is not None:
+            return stats
+            
+        lock = self._stats_locks.setdefault(key, asyncio.Lock())
+        async with lock:
+            stats = self._stats_cache.get(key)
+            if stats is None:
+                stats = await self._compute_detection_stats(camera_id)
+                self._stats_cache[key] = stats
+        return stats
+        
+    async def _compute_detection_stats(self, camera_id: str) -> Dict:
         async with AsyncSessionLocal() as session:
-            # Get recent detections (last hour)
-            one_hour_ago = datetime.utcnow() - timedelta(hours=1)
+            # Aggregate recent detections (last hour) per class in the database
+            one_hour_ago = datetime.now(timezone.utc) - timedelta(hours=1)
             
             result = await session.execute(
-                select(AlertEvent)
+                select(
+                    AlertEvent.object_class,
+                    func.count().label("count"),
+                    func.sum(AlertEvent.confidence).label("confidence_sum")
+                )
                 .where(
                     AlertEvent.camera_id == camera_id,
                     AlertEvent.timestamp >= one_hour_ago
                 )
+                .group_by(AlertEvent.object_class)
             )
-            recent_detections = result.scalars().all()
-            
-            if not recent_detections:
-                return {
-                    "total_detections": 0,
-                    "objects_by_class": [],
-                    "average_confidence": 0.0,
-                    "detection_rate": 0.0
-                }
-                
-            # Calculate statistics
-            total_detections = len(recent_detections)
-            
-            # Objects by class
-            objects_by_class = {}
-            total_confidence = 0.0
-            
-            for detection in recent_detections:
-                obj_class = detection.object_class
-                if obj_class not in objects_by_class:
-                    objects_by_class[obj_class] = 0
-                objects_by_class[obj_class] += 1
-                total_confidence += detection.confidence
-                
-            # Convert to list format
-            objects_by_class_list = [
-                {
-                    "object_class": obj_class,
-                    "count": count,
-                    "last_updated": datetime.utcnow().isoformat()
-                }
-                for obj_class, count in objects_by_class.items()
-            ]
-            
-            average_confidence = total_confidence / total_detections if total_detections > 0 else 0.0
-            
-            # Detection rate (detections per minute)
-            time_span_minutes = 60  # Last hour
-            detection_rate = total_detections / time_span_minutes if time_span_minutes > 0 else 0.0
+            rows = result.all()
             
+        if not rows:
             return {
-                "total_detections": total_detections,
-                "objects_by_class": objects_by_class_list,
-                "average_confidence": average_confidence,
-                "detection_rate": detection_rate
+                "total_detections": 0,
+                "objects_by_class": [],
+                "average_confidence": 0.0,
+                "detection_rate": 0.0
             }
             
+        # Calculate statistics
+        total_detections = sum(row.count for row in rows)
+        total_confidence = sum(row.confidence_sum for row in rows)
+        
+        # Convert to list format
+        now_iso = datetime.utcnow().isoformat()
+        objects_by_class_list = [
+            {
+                "object_class": row.object_class,
+                "count": row.count,
+                "last_updated": now_iso
+            }
+            for row in rows
+        ]
+        
+        average_confidence = total_confidence / total_detections if total_detections > 0 else 0.0
+        
+        # Detection rate (detections per minute)
+        time_span_minutes = 60  # Last hour
+        detection_rate = total_detections / time_span_minutes if time_span_minutes > 0 else 0.0
+        
+        return {
+            "total_detections": total_detections,
+            "objects_by_class": objects_by_class_list,
+            "average_confidence": average_confidence,
+            "detection_rate": detection_rate
+        }
+        
     async def broadcast_detection_stats(self, camera_id: str):
         """Broadcast detection statistics for a camera"""
-        if self.websocket_manager:
+        if self.websocket_manager or self.camera_emitter:
             stats = await self.calculate_detection_stats(camera_id)
-            await self.websocket_manager.broadcast_detection_stats(camera_id, stats)
+            if self.websocket_manager:
+                await self.websocket_manager.broadcast_detection_stats(camera_id, stats)
+            if self.camera_emitter:
+                await self.camera_emitter("detection_stats", stats, str(camera_id))
             
+    async def broadcast_camera_summary(self, camera_id: str):
+        """Broadcast object counts followed by detection statistics for a camera"""
+        await self.broadcast_object_counts(camera_id)
+        await self.broadcast_detection_stats(camera_id)
+        
     async def run_simulation(self):
         """Main simulation loop"""
         self.is_running = True
         
         while self.is_running:
             try:
+                alert_events: List[AlertEvent] = []
+                stats_camera_ids = []
+                
+                # One clock reading per cycle, shared by all its detections
+                now_ts = time.time()
+                timestamp = datetime.fromtimestamp(now_ts, timezone.utc)
+                
                 async with AsyncSessionLocal() as session:
                     # Get active cameras
                     cameras = await self.get_active_cameras(session)
+                    jobs_by_camera = await self.get_analytics_jobs_for_cameras(session, cameras)
                     
                     for camera in cameras:
-                        # Get analytics job for camera
-                        analytics_job = await self.get_analytics_job_for_camera(session, camera.id)
+                        analytics_job = jobs_by_camera.get(camera.id)
                         if not analytics_job:
                             continue
                             
@@ -277,20 +342,25 @@ class DetectionSimulator:
                         detections_this_cycle = random.randint(0, int(self.detection_rate * 2))
                         
                         for _ in range(detections_this_cycle):
-                            # Simulate detection
-                            alert_event = await self.simulate_detection(camera, analytics_job)
-                            
-                            # Save to database
-                            await self.save_detection_to_db(alert_event)
-                            
-                            # Broadcast detection
-                            await self.broadcast_detection(alert_event)
+                            alert_events.append(
+                                await self.simulate_detection(camera, analytics_job, now_ts, timestamp)
+                            )
                             
                         # Broadcast object counts and stats periodically
                         if random.random() < 0.1:  # 10% chance each cycle
-                            await self.broadcast_object_counts(camera.id)
-                            await self.broadcast_detection_stats(camera.id)
+                            stats_camera_ids.append(camera.id)
                             
+                    # One transaction for every detection of the cycle
+                    if alert_events:
+                        session.add_all(alert_events)
+                        await session.commit()
+                        
+                # Broadcast only what has been committed, one frame per cycle
+                await self.broadcast_detections(alert_events)
+                    
+                # Stats queries for different cameras overlap on separate sessions
+                await asyncio.gather(*(self.broadcast_camera_summary(camera_id) for camera_id in stats_camera_ids))
+                    
                 # Wait before next cycle
                 await asyncio.sleep(1)  # 1 second cycle
                 
@@ -10,39 +10,65 @@ from pathlib import Path
 from typing import Optional, Dict, Any
 import logging
 from datetime import datetime
+from app.core.config import settings
 
 logger = logging.getLogger(__name__)
 
+SEGMENT_SECONDS = 4.0
+
+# Every mock segment and master playlist is identical, so build the bytes once
+SEGMENT_BYTES = b"\x47\x40\x00\x10" * 1024  # Simple TS packet header repeated
+MASTER_PLAYLIST = b"""#EXTM3U
+#EXT-X-VERSION:3
+#EXT-X-STREAM-INF:BANDWIDTH=800000,RESOLUTION=640x480
+playlist.m3u8
+"""
+MEDIA_PLAYLIST_HEADER = b"#EXTM3U\n#EXT-X-VERSION:3\n#EXT-X-TARGETDURATION:4\n#EXT-X-MEDIA-SEQUENCE:%d\n"
+MEDIA_PLAYLIST_ENTRY = b"#EXTINF:4.0,\nsegment_%06d.ts\n"
+
 class MockStreamProcessor:
     """Mock stream processor that generates test HLS streams"""
     
-    def __init__(self, output_dir: str = "./hls_streams"):
+    def __init__(self, output_dir: str = "./hls_streams", buffer_size: int = settings.CAMERA_BUFFER_FRAMES):
         self.output_dir = Path(output_dir)
         self.output_dir.mkdir(parents=True, exist_ok=True)
+        self.buffer_size = buffer_size
         self.active_streams: Dict[str, bool] = {}
         self.stream_tasks: Dict[str, asyncio.Task] = {}
+        self.publish_tasks: Dict[str, asyncio.Task] = {}
+        self.segment_queues: Dict[str, asyncio.Queue] = {}
+        # camera_id -> {"start_time": ISO string, "segments_generated": int}
+        self.stream_stats: Dict[str, Dict[str, Any]] = {}
         
     async def start_stream(self, camera_id: str, rtsp_url: str) -> bool:
         """Start generating mock HLS stream for a camera"""
         if camera_id in self.active_streams:
-            logger.warning(f"Stream already active for camera {camera_id}")
+            logger.warning("Stream already active for camera %s", camera_id)
             return True
             
         try:
             self.active_streams[camera_id] = True
-            task = asyncio.create_task(self._generate_mock_stream(camera_id, rtsp_url))
-            self.stream_tasks[camera_id] = task
-            logger.info(f"Started mock stream for camera {camera_id}")
+            self.stream_stats[camera_id] = {"start_time": datetime.now().isoformat(), "segments_generated": 0}
+            queue: asyncio.Queue = asyncio.Queue(maxsize=self.buffer_size)
+            self.segment_queues[camera_id] = queue
+            self.stream_tasks[camera_id] = asyncio.create_task(
+                self._generate_mock_stream(camera_id, rtsp_url, queue)
+            )
+            self.publish_tasks[camera_id] = asyncio.create_task(
+                self._publish_segments(camera_id, queue)
+            )
+            logger.info("Started mock stream for camera %s", camera_id)
             return True
         except Exception as e:
-            logger.error(f"Failed to start mock stream for camera {camera_id}: {e}")
+            logger.error("Failed to start mock stream for camera %s: %s", camera_id, e)
             self.active_streams.pop(camera_id, None)
+            self.segment_queues.pop(camera_id, None)
             return False
     
     async def stop_stream(self, camera_id: str) -> bool:
         """Stop generating mock HLS stream for a camera"""
         if camera_id not in self.active_streams:
-            logger.warning(f"No active stream for camera {camera_id}")
+            logger.warning("No active stream for camera %s", camera_id)
             return False
             
         try:
@@ -50,96 +76,104 @@ class MockStreamProcessor:
             if camera_id in self.stream_tasks:
                 self.stream_tasks[camera_id].cancel()
                 del self.stream_tasks[camera_id]
-            logger.info(f"Stopped mock stream for camera {camera_id}")
+            if camera_id in self.publish_tasks:
+                self.publish_tasks[camera_id].cancel()
+                del self.publish_tasks[camera_id]
+            self.segment_queues.pop(camera_id, None)
+            logger.info("Stopped mock stream for camera %s", camera_id)
             return True
         except Exception as e:
-            logger.error(f"Failed to stop mock stream for camera {camera_id}: {e}")
+            logger.error("Failed to stop mock stream for camera %s: %s", camera_id, e)
             return False
     
     def get_stream_status(self, camera_id: str) -> Dict[str, Any]:
         """Get current stream status"""
+        stats = self.stream_stats.get(camera_id, {})
         return {
             "camera_id": camera_id,
-            "active": camera_id in self.active_streams and self.active_streams[camera_id],
-            "start_time": datetime.now().isoformat() if camera_id in self.active_streams else None,
-            "segments_generated": self._count_segments(camera_id)
+            "active": self.active_streams.get(camera_id, False),
+            "start_time": stats.get("start_time"),
+            "segments_generated": stats.get("segments_generated", 0)
         }
     
-    async def _generate_mock_stream(self, camera_id: str, rtsp_url: str):
-        """Generate mock HLS stream segments"""
+    async def _generate_mock_stream(self, camera_id: str, rtsp_url: str, queue: asyncio.Queue):
+        """Generate mock HLS stream segments (producer side of the camera buffer)"""
         camera_dir = self.output_dir / camera_id
-        camera_dir.mkdir(parents=True, exist_ok=True)
+        await asyncio.to_thread(camera_dir.mkdir, parents=True, exist_ok=True)
         
         # Generate master playlist
         master_playlist = camera_dir / "index.m3u8"
         await self._write_master_playlist(master_playlist, camera_id)
         
+        stats = self.stream_stats[camera_id]
         segment_index = 0
+        # Segments are paced against a fixed schedule so write time does not add drift
+        loop = asyncio.get_running_loop()
+        next_deadline = loop.time()
         
         while self.active_streams.get(camera_id, False):
             try:
                 # Generate segment
                 segment_file = camera_dir / f"segment_{segment_index:06d}.ts"
                 await self._generate_segment(segment_file, segment_index)
-                
-                # Update media playlist
-                media_playlist = camera_dir / "playlist.m3u8"
-                await self._update_media_playlist(media_playlist, segment_index)
+                self._enqueue_latest(queue, segment_index)
                 
                 segment_index += 1
+                stats["segments_generated"] = segment_index
                 
                 # Wait for next segment (4 seconds for 4-second segments)
-                await asyncio.sleep(4)
+                next_deadline += SEGMENT_SECONDS
+                await asyncio.sleep(max(0.0, next_deadline - loop.time()))
                 
             except asyncio.CancelledError:
-                logger.info(f"Mock stream generation cancelled for camera {camera_id}")
+                logger.info("Mock stream generation cancelled for camera %s", camera_id)
                 break
             except Exception as e:
-                logger.error(f"Error generating mock stream for camera {camera_id}: {e}")
+                logger.error("Error generating mock stream for camera %s: %s", camera_id, e)
                 await asyncio.sleep(1)
     
+    def _enqueue_latest(self, queue: asyncio.Queue, segment_index: int):
+        """Buffer a segment, dropping the oldest one when the consumer falls behind"""
+        try:
+            queue.put_nowait(segment_index)
+        except asyncio.QueueFull:
+            queue.get_nowait()
+            queue.put_nowait(segment_index)
+    
+    async def _publish_segments(self, camera_id: str, queue: asyncio.Queue):
+        """Drain buffered segments into the media playlist (consumer side)"""
+        media_playlist = self.output_dir / camera_id / "playlist.m3u8"
+        
+        while True:
+            try:
+                segment_index = await queue.get()
+                await self._update_media_playlist(media_playlist, segment_index)
+            except asyncio.CancelledError:
+                break
+            except Exception as e:
+                logger.error("Error publishing segments for camera %s: %s", camera_id, e)
+    
     async def _write_master_playlist(self, playlist_path: Path, camera_id: str):
         """Write master HLS playlist"""
-        content = f"""#EXTM3U
-#EXT-X-VERSION:3
-#EXT-X-STREAM-INF:BANDWIDTH=800000,RESOLUTION=640x480
-playlist.m3u8
-"""
-        playlist_path.write_text(content)
-        logger.debug(f"Created master playlist for camera {camera_id}")
+        await asyncio.to_thread(playlist_path.write_bytes, MASTER_PLAYLIST)
+        logger.debug("Created master playlist for camera %s", camera_id)
     
     async def _generate_segment(self, segment_path: Path, index: int):
         """Generate a mock video segment"""
         # Create a small dummy TS file (in real implementation, this would be actual video data)
-        dummy_data = b"\x47\x40\x00\x10" * 1024  # Simple TS packet header repeated
-        segment_path.write_bytes(dummy_data)
-        logger.debug(f"Generated segment {index} at {segment_path}")
+        await asyncio.to_thread(segment_path.write_bytes, SEGMENT_BYTES)
+        logger.debug("Generated segment %s at %s", index, segment_path)
     
     async def _update_media_playlist(self, playlist_path: Path, last_segment: int):
         """Update media playlist with latest segments"""
         # Keep last 5 segments in playlist
         start_segment = max(0, last_segment - 4)
         
-        segments = []
-        for i in range(start_segment, last_segment + 1):
-            segments.append(f"#EXTINF:4.0,")
-            segments.append(f"segment_{i:06d}.ts")
-        
-        content = f"""#EXTM3U
-#EXT-X-VERSION:3
-#EXT-X-TARGETDURATION:4
-#EXT-X-MEDIA-SEQUENCE:{start_segment}
-{chr(10).join(segments)}
-"""
-        playlist_path.write_text(content)
-        logger.debug(f"Updated media playlist with segments {start_segment}-{last_segment}")
-    
-    def _count_segments(self, camera_id: str) -> int:
-        """Count generated segments for a camera"""
-        camera_dir = self.output_dir / camera_id
-        if not camera_dir.exists():
-            return 0
-        return len(list(camera_dir.glob("segment_*.ts")))
+        content = MEDIA_PLAYLIST_HEADER % start_segment + b"".join(
+            MEDIA_PLAYLIST_ENTRY % i for i in range(start_segment, last_segment + 1)
+        )
+        await asyncio.to_thread(playlist_path.write_bytes, content)
+        logger.debug("Updated media playlist with segments %s-%s", start_segment, last_segment)
 
 # Global instance
 mock_stream_processor = MockStreamProcessor()
\ No newline at end of file
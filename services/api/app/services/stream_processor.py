@@ -1,15 +1,43 @@
 import asyncio
 import cv2
 import numpy as np
-from typing import Optional, Dict, Any, List
-from datetime import datetime, timedelta
+from typing import Optional, Dict, Any, List, Union
+from datetime import datetime, timedelta, timezone
 import json
 import logging
+import os
+import threading
+import time
+from bisect import bisect_left
+from concurrent.futures import ThreadPoolExecutor
+from operator import itemgetter
 from dataclasses import dataclass
 from uuid import uuid4
 
 logger = logging.getLogger(__name__)
 
+# RTSP over TCP with no demuxer-side buffering; read by OpenCV when a capture is opened
+os.environ.setdefault("OPENCV_FFMPEG_CAPTURE_OPTIONS", "rtsp_transport;tcp|buffer_size;0")
+
+# Streams are parallelised one frame per worker thread; OpenCV's own pool would
+# only make those workers contend for the same cores
+cv2.setNumThreads(1)
+
+# Frames kept per stream for motion analysis and HLS segments
+FRAME_RING_SIZE = 10
+
+# How long closing a stream waits for a capture thread stuck in grab() on a stalled camera
+CAPTURE_JOIN_TIMEOUT = 5.0
+
+def _iso_from_ns(ts_ns: int) -> str:
+    """Naive-UTC ISO string, the format these timestamps were always reported in"""
+    return datetime.fromtimestamp(ts_ns / 1e9, timezone.utc).replace(tzinfo=None).isoformat()
+
+def _ns_from_datetime(value: datetime) -> int:
+    if value.tzinfo is None:
+        value = value.replace(tzinfo=timezone.utc)
+    return int(value.timestamp() * 1e9)
+
 @dataclass
 class StreamConfig:
     """Video stream configuration"""
@@ -22,6 +50,8 @@ class StreamConfig:
     buffer_size: int = 30
     reconnect_attempts: int = 3
     reconnect_delay: int = 5
+    # ffmpeg H.264 encoder for HLS segments: libx264 (CPU) or h264_nvenc (NVIDIA GPU)
+    video_encoder: str = "libx264"
 
 class VideoStreamProcessor:
     """
@@ -33,14 +63,29 @@ class VideoStreamProcessor:
         self.config = config
         self.cap: Optional[cv2.VideoCapture] = None
         self.is_connected = False
-        self.frame_buffer: List[np.ndarray] = []
+        # Last FRAME_RING_SIZE frames in a preallocated ring, allocated on the first frame
+        self._ring: Optional[np.ndarray] = None
+        # Half-resolution grayscale copies of the same frames, used for motion scoring
+        self._gray_ring: Optional[np.ndarray] = None
+        self._ring_frame_numbers = np.zeros(FRAME_RING_SIZE, dtype=np.int64)
+        self._ring_head = 0
+        self._ring_filled = 0
         self.metadata_buffer: List[Dict[str, Any]] = []
         self.current_frame: Optional[np.ndarray] = None
         self.frame_count = 0
         self.error_count = 0
-        self.last_frame_time = datetime.utcnow()
+        self.last_frame_ns = time.time_ns()
         self.stream_status = "idle"
         self.stream_metadata: Dict[str, Any] = {}
+        # Newest decoded frame, published by the capture thread; older ones are dropped
+        self._frame_lock = threading.Lock()
+        self._latest_frame: Optional[np.ndarray] = None
+        self._latest_seq = 0
+        self._read_seq = 0
+        # Set by read_frame when it is ready for a new frame; until then the capture
+        # thread only grab()s, skipping the BGR conversion and copy of frames nobody reads
+        self._frame_wanted = True
+        self._capture_thread: Optional[threading.Thread] = None
         
     async def connect(self) -> bool:
         """Connect to the video stream"""
@@ -48,8 +93,8 @@ class VideoStreamProcessor:
             # Configure OpenCV for RTSP streaming
             self.cap = cv2.VideoCapture(self.config.url)
             
-            # Set buffer size to reduce latency
-            self.cap.set(cv2.CAP_PROP_BUFFERSIZE, self.config.buffer_size)
+            # Keep a single frame queued in the backend; the capture thread drains it
+            self.cap.set(cv2.CAP_PROP_BUFFERSIZE, 1)
             
             # Set resolution based on quality
             if self.config.quality == "high":
@@ -69,7 +114,11 @@ class VideoStreamProcessor:
                 self.stream_status = "connected"
                 self.current_frame = frame
                 self.frame_count += 1
-                self.last_frame_time = datetime.utcnow()
+                self.last_frame_ns = time.time_ns()
+                self._capture_thread = threading.Thread(
+                    target=self._capture_loop, name=f"capture-{self.config.camera_id}", daemon=True
+                )
+                self._capture_thread.start()
                 logger.info(f"Successfully connected to stream: {self.config.camera_id}")
                 return True
             else:
@@ -82,9 +131,29 @@ class VideoStreamProcessor:
             self.cleanup()
             return False
     
+    def stop(self):
+        """Ask the capture thread and the stream's processing task to stop; the task then calls close()"""
+        self.is_connected = False
+    
+    async def close(self):
+        """Stop the capture thread, waiting for it off the event loop, then clean up"""
+        self.is_connected = False
+        if self._capture_thread:
+            await asyncio.to_thread(self._capture_thread.join, CAPTURE_JOIN_TIMEOUT)
+            if self._capture_thread.is_alive():
+                logger.warning(
+                    "Capture thread for stream %s did not stop within %ss", self.config.camera_id, CAPTURE_JOIN_TIMEOUT
+                )
+        self.cleanup()
+    
     def cleanup(self):
         """Clean up resources"""
-        if self.cap:
+        self.is_connected = False
+        capture_thread, self._capture_thread = self._capture_thread, None
+        
+        # A capture thread still blocked in grab() keeps its own reference and the
+        # capture is freed when it exits; releasing it under that call is unsafe
+        if self.cap and not (capture_thread and capture_thread.is_alive()):
             try:
                 self.cap.release()
             except Exception as e:
@@ -93,41 +162,64 @@ class VideoStreamProcessor:
         self.cap = None
         self.is_connected = False
         self.stream_status = "disconnected"
-        self.frame_buffer.clear()
+        self._ring = None
+        self._gray_ring = None
+        self._ring_head = 0
+        self._ring_filled = 0
         self.metadata_buffer.clear()
+        with self._frame_lock:
+            self._latest_frame = None
     
-    async def read_frame(self) -> Optional[np.ndarray]:
-        """Read a single frame from the stream"""
-        if not self.cap or not self.is_connected:
-            return None
-        
-        try:
-            ret, frame = self.cap.read()
+    def _capture_loop(self):
+        """Capture thread: grab frames as fast as the camera sends them and retrieve only the newest"""
+        cap = self.cap
+        while self.is_connected:
+            try:
+                ret, frame = cap.grab(), None
+                if ret:
+                    self.error_count = 0  # Reset error count on every successful grab
+                    if not self._frame_wanted:
+                        # Nobody is waiting; keep the backend queue drained and move on
+                        continue
+                    ret, frame = cap.retrieve()
+            except Exception as e:
+                logger.error("Error reading frame from stream %s: %s", self.config.camera_id, e)
+                ret, frame = False, None
+            
             if ret and frame is not None:
-                self.current_frame = frame
-                self.frame_count += 1
-                self.last_frame_time = datetime.utcnow()
-                self.error_count = 0  # Reset error count on successful read
-                return frame
-            else:
-                self.error_count += 1
-                logger.warning(f"Failed to read frame from stream {self.config.camera_id}, error count: {self.error_count}")
-                
-                # If too many consecutive errors, disconnect
-                if self.error_count >= self.config.reconnect_attempts:
-                    logger.error(f"Too many consecutive errors, disconnecting from stream {self.config.camera_id}")
-                    self.cleanup()
-                
-                return None
-                
-        except Exception as e:
-            logger.error(f"Error reading frame from stream {self.config.camera_id}: {e}")
+                # retrieve() returns a fresh array, so publishing the reference cannot tear
+                with self._frame_lock:
+                    self._latest_frame = frame
+                    self._latest_seq += 1
+                    self._frame_wanted = False
+                continue
+            
             self.error_count += 1
+            logger.warning(
+                "Failed to read frame from stream %s, error count: %d", self.config.camera_id, self.error_count
+            )
             
+            # If too many consecutive errors, disconnect; the stream task then cleans up
             if self.error_count >= self.config.reconnect_attempts:
-                self.cleanup()
-            
+                logger.error("Too many consecutive errors, disconnecting from stream %s", self.config.camera_id)
+                self.is_connected = False
+    
+    async def read_frame(self) -> Optional[np.ndarray]:
+        """Newest frame from the capture thread, or None if there is none since the last call"""
+        if not self.is_connected:
             return None
+        
+        with self._frame_lock:
+            if self._latest_seq == self._read_seq:
+                self._frame_wanted = True
+                return None
+            frame = self._latest_frame
+            self._read_seq = self._latest_seq
+        
+        self.current_frame = frame
+        self.frame_count += 1
+        self.last_frame_ns = time.time_ns()
+        return frame
     
     def get_stream_info(self) -> Dict[str, Any]:
         """Get current stream information"""
@@ -155,7 +247,7 @@ class VideoStreamProcessor:
             "fps": fps if fps > 0 else self.config.fps,
             "resolution": f"{int(width)}x{int(height)}",
             "bitrate": bitrate,
-            "last_frame_time": self.last_frame_time.isoformat(),
+            "last_frame_time": _iso_from_ns(self.last_frame_ns),
             "stream_metadata": self.stream_metadata
         }
     
@@ -163,30 +255,35 @@ class VideoStreamProcessor:
         """Process a frame and extract metadata"""
         height, width = frame.shape[:2]
         
+        # Per-channel mean/stddev in one OpenCV pass; channels have equal pixel
+        # counts, so the whole-frame values follow exactly from them
+        channel_mean, channel_std = cv2.meanStdDev(frame)
+        brightness = float(channel_mean.mean())
+        contrast = float(np.sqrt(max(0.0, (channel_std ** 2 + channel_mean ** 2).mean() - brightness ** 2)))
+        
         # Basic frame analysis
         metadata = {
-            "timestamp": datetime.utcnow().isoformat(),
+            "ts_ns": self.last_frame_ns,
             "frame_number": self.frame_count,
             "resolution": {"width": width, "height": height},
-            "brightness": float(np.mean(frame)),
-            "contrast": float(np.std(frame)),
+            "brightness": brightness,
+            "contrast": contrast,
             "motion_score": 0.0,  # Will be calculated if previous frame exists
             "quality_score": 1.0  # Will be calculated based on various factors
         }
         
+        # Motion works on a half-resolution grayscale frame: a quarter of the
+        # pixels and one channel instead of three
+        gray = cv2.pyrDown(frame if frame.ndim == 2 else cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY))
+        
         # Calculate motion score if we have a previous frame
-        if len(self.frame_buffer) > 0:
-            prev_frame = self.frame_buffer[-1]
-            if prev_frame.shape == frame.shape:
-                # Simple motion detection using frame difference
-                diff = cv2.absdiff(prev_frame, frame)
-                motion_score = float(np.mean(diff))
-                metadata["motion_score"] = motion_score
+        if self._ring is not None and self._ring_filled and self._ring.shape[1:] == frame.shape:
+            prev_gray = self._gray_ring[(self._ring_head - 1) % FRAME_RING_SIZE]
+            # Simple motion detection using frame difference
+            metadata["motion_score"] = float(cv2.mean(cv2.absdiff(prev_gray, gray))[0])
         
         # Add frame to buffer (keep last 10 frames for analysis)
-        self.frame_buffer.append(frame.copy())
-        if len(self.frame_buffer) > 10:
-            self.frame_buffer.pop(0)
+        self._store_frame(frame, gray)
         
         # Add metadata to buffer
         self.metadata_buffer.append(metadata)
@@ -195,40 +292,67 @@ class VideoStreamProcessor:
         
         return metadata
     
+    def _store_frame(self, frame: np.ndarray, gray: np.ndarray):
+        """Copy a frame and its motion image into the next ring slot, overwriting the oldest once full"""
+        if self._ring is None or self._ring.shape[1:] != frame.shape:
+            # First frame, or the stream changed resolution
+            self._ring = np.empty((FRAME_RING_SIZE, *frame.shape), dtype=frame.dtype)
+            self._gray_ring = np.empty((FRAME_RING_SIZE, *gray.shape), dtype=gray.dtype)
+            self._ring_head = 0
+            self._ring_filled = 0
+        np.copyto(self._ring[self._ring_head], frame)
+        np.copyto(self._gray_ring[self._ring_head], gray)
+        self._ring_frame_numbers[self._ring_head] = self.frame_count
+        self._ring_head = (self._ring_head + 1) % FRAME_RING_SIZE
+        self._ring_filled = min(self._ring_filled + 1, FRAME_RING_SIZE)
+    
+    def _ring_slots(self) -> List[int]:
+        """Ring indices of the buffered frames, oldest first"""
+        start = self._ring_head - self._ring_filled
+        return [(start + i) % FRAME_RING_SIZE for i in range(self._ring_filled)]
+    
     async def generate_hls_segment(self, duration: int = 2) -> Optional[Dict[str, Any]]:
         """Generate HLS segment from buffered frames"""
-        if not self.frame_buffer:
+        if not self._ring_filled:
             return None
+        slots = self._ring_slots()
         
         try:
-            # Create video writer for HLS segment
             segment_id = str(uuid4())[:8]
             output_path = f"/tmp/hls_{self.config.camera_id}_{segment_id}.ts"
             
-            # Get frame dimensions from first frame
-            first_frame = self.frame_buffer[0]
-            height, width = first_frame.shape[:2]
-            
-            # Create video writer
-            fourcc = cv2.VideoWriter_fourcc(*'mp4v')
-            out = cv2.VideoWriter(output_path, fourcc, self.config.fps, (width, height))
-            
-            # Write frames to segment
-            for frame in self.frame_buffer:
-                out.write(frame)
+            # Get frame dimensions from the buffered frames
+            height, width = self._ring.shape[1:3]
             
-            out.release()
+            # Encode the raw BGR frames to H.264 MPEG-TS in an ffmpeg child process;
+            # the event loop only feeds stdin and waits
+            process = await asyncio.create_subprocess_exec(
+                "ffmpeg", "-loglevel", "error", "-y",
+                "-f", "rawvideo", "-pix_fmt", "bgr24", "-s", f"{width}x{height}",
+                "-r", str(self.config.fps), "-i", "pipe:0",
+                "-c:v", self.config.video_encoder, "-pix_fmt", "yuv420p", "-g", str(len(slots)),
+                "-f", "mpegts", output_path,
+                stdin=asyncio.subprocess.PIPE,
+                stderr=asyncio.subprocess.PIPE
+            )
+            _, stderr = await process.communicate(self._ring[slots].tobytes())
+            if process.returncode != 0:
+                logger.error(
+                    "ffmpeg failed to encode HLS segment for camera %s: %s",
+                    self.config.camera_id, stderr.decode(errors="replace").strip()
+                )
+                return None
             
             # Calculate segment metadata
             segment_metadata = {
                 "segment_id": segment_id,
                 "camera_id": self.config.camera_id,
                 "duration": duration,
-                "frame_count": len(self.frame_buffer),
+                "frame_count": len(slots),
                 "resolution": f"{width}x{height}",
                 "file_path": output_path,
                 "timestamp": datetime.utcnow().isoformat(),
-                "size": cv2.imencode('.jpg', first_frame)[1].nbytes * len(self.frame_buffer)  # Approximate size
+                "size": os.path.getsize(output_path)
             }
             
             return segment_metadata
@@ -238,29 +362,34 @@ class VideoStreamProcessor:
             return None
     
     def get_recent_metadata(self, count: int = 10) -> List[Dict[str, Any]]:
-        """Get recent frame metadata"""
-        return self.metadata_buffer[-count:] if self.metadata_buffer else []
+        """Get recent frame metadata, with ISO timestamps formatted on the way out"""
+        return [
+            {**metadata, "timestamp": _iso_from_ns(metadata["ts_ns"])}
+            for metadata in self.metadata_buffer[-count:]
+        ]
     
-    def get_frame_at_time(self, timestamp: datetime) -> Optional[np.ndarray]:
-        """Get frame closest to specified timestamp"""
+    def get_frame_at_time(self, timestamp: Union[datetime, int]) -> Optional[np.ndarray]:
+        """Get frame closest to specified timestamp (a datetime, naive meaning UTC, or epoch ns)"""
         if not self.metadata_buffer:
             return None
         
-        # Find metadata entry closest to timestamp
-        closest_idx = 0
-        min_time_diff = float('inf')
+        target_ns = timestamp if isinstance(timestamp, int) else _ns_from_datetime(timestamp)
         
-        for i, metadata in enumerate(self.metadata_buffer):
-            meta_time = datetime.fromisoformat(metadata["timestamp"])
-            time_diff = abs((meta_time - timestamp).total_seconds())
-            
-            if time_diff < min_time_diff:
-                min_time_diff = time_diff
-                closest_idx = i
+        # Metadata is appended in capture order, so binary-search the timestamps
+        # and pick the nearer of the two neighbours
+        closest_idx = bisect_left(self.metadata_buffer, target_ns, key=itemgetter("ts_ns"))
+        if closest_idx == len(self.metadata_buffer) or (
+            closest_idx > 0
+            and target_ns - self.metadata_buffer[closest_idx - 1]["ts_ns"]
+            <= self.metadata_buffer[closest_idx]["ts_ns"] - target_ns
+        ):
+            closest_idx -= 1
         
-        # Return corresponding frame if available
-        if closest_idx < len(self.frame_buffer):
-            return self.frame_buffer[closest_idx]
+        # Return corresponding frame if it is still buffered
+        frame_number = self.metadata_buffer[closest_idx]["frame_number"]
+        for slot in self._ring_slots():
+            if self._ring_frame_numbers[slot] == frame_number:
+                return self._ring[slot].copy()
         
         return None
 
@@ -273,6 +402,10 @@ class StreamManager:
         self.streams: Dict[str, VideoStreamProcessor] = {}
         self.hls_playlists: Dict[str, List[Dict[str, Any]]] = {}
         self.max_segments_per_playlist = 10
+        # Per-frame analysis runs here so the event loop only schedules it
+        self._pool = ThreadPoolExecutor(max_workers=os.cpu_count(), thread_name_prefix="frame")
+        # Processing task per stream; it owns the processor's teardown
+        self._tasks: Dict[str, asyncio.Task] = {}
         
     async def start_stream(self, camera_id: str, stream_url: str, config: Optional[StreamConfig] = None) -> bool:
         """Start a new video stream"""
@@ -297,7 +430,7 @@ class StreamManager:
             logger.info(f"Successfully started stream for camera {camera_id}")
             
             # Start background processing
-            asyncio.create_task(self._process_stream(camera_id))
+            self._tasks[camera_id] = asyncio.create_task(self._process_stream(camera_id))
             
         return success
     
@@ -307,14 +440,10 @@ class StreamManager:
             logger.warning(f"Stream not found for camera {camera_id}")
             return False
         
-        processor = self.streams[camera_id]
-        processor.cleanup()
-        
-        del self.streams[camera_id]
-        if camera_id in self.hls_playlists:
-            del self.hls_playlists[camera_id]
-        
-        logger.info(f"Stopped stream for camera {camera_id}")
+        # Frame analysis may be running on the pool; only the processing task knows
+        # when it has finished, so signal it and wait for it to tear the stream down
+        self.streams[camera_id].stop()
+        await asyncio.shield(self._tasks[camera_id])
         return True
     
     async def _process_stream(self, camera_id: str):
@@ -323,13 +452,17 @@ class StreamManager:
         if not processor:
             return
         
+        loop = asyncio.get_running_loop()
+        analysis: Optional[asyncio.Future] = None
         try:
             while processor.is_connected:
                 # Read frame
                 frame = await processor.read_frame()
                 if frame is not None:
                     # Process frame
-                    metadata = processor.process_frame(frame)
+                    analysis = loop.run_in_executor(self._pool, processor.process_frame, frame)
+                    # Shielded: a cancelled task must not mark it done while the worker still runs
+                    metadata = await asyncio.shield(analysis)
                     
                     # Generate HLS segment every few seconds
                     if processor.frame_count % (processor.config.fps * 2) == 0:
@@ -343,9 +476,14 @@ class StreamManager:
         except Exception as e:
             logger.error(f"Error processing stream {camera_id}: {e}")
         finally:
-            # Cleanup if processing stops
-            if camera_id in self.streams:
-                await self.stop_stream(camera_id)
+            # Cleanup if processing stops, never while a worker is still writing the ring buffer
+            if analysis is not None and not analysis.done():
+                await asyncio.wait([analysis])
+            await processor.close()
+            self.streams.pop(camera_id, None)
+            self.hls_playlists.pop(camera_id, None)
+            self._tasks.pop(camera_id, None)
+            logger.info(f"Stopped stream for camera {camera_id}")
     
     async def _add_hls_segment(self, camera_id: str, segment: Dict[str, Any]):
         """Add HLS segment to playlist"""
@@ -361,7 +499,6 @@ class StreamManager:
             old_segment = playlist.pop(0)
             # Clean up old segment file
             try:
-                import os
                 if os.path.exists(old_segment["file_path"]):
                     os.remove(old_segment["file_path"])
             except Exception as e:
@@ -1,6 +1,6 @@
 import asyncio
-import json
-from typing import Dict, Set, Any
+import orjson
+from typing import Dict, Iterable, Set, Any
 from fastapi import WebSocket
 from datetime import datetime
 import logging
@@ -25,7 +25,7 @@ class ConnectionManager:
                 self.user_subscriptions[user_id] = set()
             self.user_subscriptions[user_id].add(websocket)
             
-        logger.info(f"WebSocket connected. Total connections: {len(self.active_connections)}")
+        logger.info("WebSocket connected. Total connections: %s", len(self.active_connections))
         
     def disconnect(self, websocket: WebSocket, user_id: str = None):
         """Remove a WebSocket connection"""
@@ -38,12 +38,12 @@ class ConnectionManager:
                 del self.user_subscriptions[user_id]
                 
         # Remove from camera subscriptions
-        for camera_id, websockets in self.camera_subscriptions.items():
+        for camera_id, websockets in list(self.camera_subscriptions.items()):
             websockets.discard(websocket)
             if not websockets:
                 del self.camera_subscriptions[camera_id]
                 
-        logger.info(f"WebSocket disconnected. Total connections: {len(self.active_connections)}")
+        logger.info("WebSocket disconnected. Total connections: %s", len(self.active_connections))
         
     async def subscribe_to_camera(self, websocket: WebSocket, camera_id: str):
         """Subscribe a WebSocket to a specific camera"""
@@ -51,7 +51,7 @@ class ConnectionManager:
             self.camera_subscriptions[camera_id] = set()
         self.camera_subscriptions[camera_id].add(websocket)
         
-        logger.info(f"WebSocket subscribed to camera {camera_id}")
+        logger.debug("WebSocket subscribed to camera %s", camera_id)
         
     def unsubscribe_from_camera(self, websocket: WebSocket, camera_id: str):
         """Unsubscribe a WebSocket from a specific camera"""
@@ -60,62 +60,45 @@ class ConnectionManager:
             if not self.camera_subscriptions[camera_id]:
                 del self.camera_subscriptions[camera_id]
                 
-        logger.info(f"WebSocket unsubscribed from camera {camera_id}")
+        logger.debug("WebSocket unsubscribed from camera %s", camera_id)
         
-    async def send_personal_message(self, message: dict, websocket: WebSocket):
-        """Send a message to a specific WebSocket"""
+    async def _send_text(self, websocket: WebSocket, text: str):
+        """Send an already-encoded frame, dropping the connection if it fails"""
         try:
-            await websocket.send_json(message)
+            await websocket.send_text(text)
         except Exception as e:
-            logger.error(f"Error sending message to WebSocket: {e}")
+            logger.error("Error sending message to WebSocket: %s", e)
             # Remove broken connection
-            await self.disconnect(websocket)
+            self.disconnect(websocket)
             
-    async def broadcast_message(self, message: dict):
-        """Broadcast a message to all connected WebSockets"""
-        if not self.active_connections:
+    async def _fan_out(self, websockets: Iterable[WebSocket], message: dict):
+        """Encode a message once and send it to every socket concurrently"""
+        websockets = list(websockets)
+        if not websockets:
             return
             
-        # Create list of send tasks
-        tasks = []
-        for connection in list(self.active_connections):
-            tasks.append(self.send_personal_message(message, connection))
+        # Text frames: the frontend JSON.parses event.data
+        text = orjson.dumps(message).decode()
+        await asyncio.gather(
+            *(self._send_text(websocket, text) for websocket in websockets),
+            return_exceptions=True
+        )
+        
+    async def send_personal_message(self, message: dict, websocket: WebSocket):
+        """Send a message to a specific WebSocket"""
+        await self._send_text(websocket, orjson.dumps(message).decode())
             
-        # Send to all connections concurrently
-        if tasks:
-            await asyncio.gather(*tasks, return_exceptions=True)
+    async def broadcast_message(self, message: dict):
+        """Broadcast a message to all connected WebSockets"""
+        await self._fan_out(self.active_connections, message)
             
     async def broadcast_to_camera_subscribers(self, camera_id: str, message: dict):
         """Broadcast a message to WebSockets subscribed to a specific camera"""
-        if camera_id not in self.camera_subscriptions:
-            return
-            
-        websockets = list(self.camera_subscriptions[camera_id])
-        if not websockets:
-            return
-            
-        tasks = []
-        for websocket in websockets:
-            tasks.append(self.send_personal_message(message, websocket))
-            
-        if tasks:
-            await asyncio.gather(*tasks, return_exceptions=True)
+        await self._fan_out(self.camera_subscriptions.get(camera_id, ()), message)
             
     async def broadcast_to_user_subscribers(self, user_id: str, message: dict):
         """Broadcast a message to WebSockets subscribed to a specific user"""
-        if user_id not in self.user_subscriptions:
-            return
-            
-        websockets = list(self.user_subscriptions[user_id])
-        if not websockets:
-            return
-            
-        tasks = []
-        for websocket in websockets:
-            tasks.append(self.send_personal_message(message, websocket))
-            
-        if tasks:
-            await asyncio.gather(*tasks, return_exceptions=True)
+        await self._fan_out(self.user_subscriptions.get(user_id, ()), message)
             
     # Specific broadcast methods for detection data
     async def broadcast_detection(self, detection_data: dict):
@@ -134,6 +117,27 @@ class ConnectionManager:
         if camera_id:
             await self.broadcast_to_camera_subscribers(camera_id, message)
             
+    async def broadcast_detections(self, detections: list):
+        """Broadcast a batch of detection events in a single frame"""
+        message = {
+            "type": "detections",
+            "data": detections,
+            "timestamp": datetime.utcnow().isoformat()
+        }
+        
+        # Sockets without a camera subscription get the whole batch; subscribed
+        # ones only their cameras' share below, so nothing arrives twice
+        subscribed = set().union(*self.camera_subscriptions.values())
+        await self._fan_out(self.active_connections - subscribed, message)
+        
+        by_camera: Dict[str, list] = {}
+        for detection in detections:
+            camera_id = detection.get("camera_id")
+            if camera_id and camera_id in self.camera_subscriptions:
+                by_camera.setdefault(camera_id, []).append(detection)
+        for camera_id, camera_detections in by_camera.items():
+            await self.broadcast_to_camera_subscribers(camera_id, {**message, "data": camera_detections})
+            
     async def broadcast_object_counts(self, camera_id: str, counts: list):
         """Broadcast object count updates"""
         message = {
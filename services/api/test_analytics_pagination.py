@@ -0,0 +1,62 @@
+#!/usr/bin/env python3
+"""Test keyset pagination of GET /analytics/jobs across several pages"""
+
+import asyncio
+import sys
+from pathlib import Path
+from types import SimpleNamespace
+sys.path.append(str(Path(__file__).resolve().parent))
+
+import orjson
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+from sqlmodel import SQLModel
+
+from app.models.models import AIModel, AnalyticsJob, Camera, User
+from app.routers.analytics import read_analytics_jobs
+
+async def _paginate_jobs():
+    # SQLite stores the server-side created_at at one-second resolution, so all
+    # of these jobs share a timestamp; the cursor must still move forward
+    engine = create_async_engine("sqlite+aiosqlite:///:memory:")
+    async with engine.begin() as conn:
+        await conn.run_sync(SQLModel.metadata.create_all)
+    session_factory = async_sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)
+
+    async with session_factory() as db:
+        user = User(username="pager", email="pager@example.com", hashed_password="x")
+        model = AIModel(name="yolo", version="8", config_path="c", weights_path="w", labels_path="l")
+        db.add_all([user, model])
+        await db.flush()
+        camera = Camera(name="cam", url="rtsp://cam/stream", owner_id=user.id)
+        db.add(camera)
+        await db.flush()
+        jobs = [
+            AnalyticsJob(name=f"job {i}", camera_id=camera.id, ai_model_id=model.id, created_by_id=user.id)
+            for i in range(5)
+        ]
+        db.add_all(jobs)
+        await db.commit()
+
+        pages = []
+        cursor = None
+        for _ in range(len(jobs) + 1):
+            response = await read_analytics_jobs(cursor=cursor, limit=2, user=SimpleNamespace(id=user.id), db=db)
+            pages.append([job["id"] for job in orjson.loads(response.body)])
+            cursor = response.headers.get("X-Next-Cursor")
+            if cursor is None:
+                break
+
+    await engine.dispose()
+    return pages, sorted((str(job.id) for job in jobs), reverse=True)
+
+def test_paginate_jobs():
+    """Pages are disjoint, newest first, and together return every job once"""
+    pages, expected_ids = asyncio.run(_paginate_jobs())
+    print(f"Pages: {pages}")
+
+    assert [len(page) for page in pages] == [2, 2, 1]
+    assert [job_id for page in pages for job_id in page] == expected_ids
+
+if __name__ == "__main__":
+    test_paginate_jobs()
+    print("Pagination test passed")
@@ -4,6 +4,7 @@
 import asyncio
 import sys
 import os
+from pathlib import Path
 sys.path.append('/Users/sanikeit/Documents/trae_projects/aries/services/api')
 
 from app.services.mock_stream_processor import mock_stream_processor
@@ -30,9 +31,6 @@ async def test_mock_stream():
         print(f"Stream status: {status}")
         
         # Check if files were created
-        import os
-        from pathlib import Path
-        
         stream_dir = Path(f"./hls_streams/{camera_id}")
         if stream_dir.exists():
             files = list(stream_dir.glob("*"))